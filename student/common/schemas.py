@@ -37,7 +37,7 @@ class Day2Plan:
     force_rag_only: bool = True
     return_draft_when_enough: bool = True
     max_context: int = 1200
-    embedding_model: str = "text-embedding-3-small"
+    embedding_model: str = "text-embedding-3-small"  # "local-hash-<dim>" 이면 오프라인 로컬 임베딩
 
 # (선택) RAG Context 아이템도 dataclass를 쓸 경우 예시
 @dataclass
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+임베딩 백엔드 (Embeddings 가 실제 벡터를 얻는 곳)
+- OpenAIBackend : OpenAI embeddings API (기본, OPENAI_API_KEY 필요)
+- HashingBackend: 네트워크 없이 동작하는 결정적 로컬 임베딩
+                  문자 n-gram 을 고정 차원으로 해싱 (NumPy 벡터화)
+                  모델명 "local-hash-<dim>" 으로 선택 (예: local-hash-1536)
+                  → 오프라인/에어갭 환경, build_index·FaissStore 처리량 벤치마크용
+"""
+
+import os, re, asyncio, weakref
+from typing import Any, List, Tuple
+import numpy as np
+from openai import OpenAI, AsyncOpenAI
+
+LOCAL_HASH_PREFIX = "local-hash-"
+
+ASYNC_MAX_INFLIGHT = int(os.getenv("DAY2_EMBED_MAX_INFLIGHT", "8"))  # 이벤트 루프 전체 동시 요청 상한
+
+# 이벤트 루프별 공유 자원: AsyncOpenAI 클라이언트(커넥션 풀) + 세마포어
+_ASYNC_SHARED: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+
+def _async_shared(api_key: str) -> tuple:
+    """현재 이벤트 루프에 묶인 (AsyncOpenAI, Semaphore) 반환 (없으면 생성)"""
+    loop = asyncio.get_running_loop()
+    shared = _ASYNC_SHARED.get(loop)
+    if shared is None:
+        shared = (AsyncOpenAI(api_key=api_key), asyncio.Semaphore(ASYNC_MAX_INFLIGHT))
+        _ASYNC_SHARED[loop] = shared
+    return shared
+
+
+def _response_matrix(resp: Any, n: int) -> np.ndarray:
+    """임베딩 응답 → (n, D) float32, item.index 기준으로 입력 순서에 재배치"""
+    data = sorted(resp.data, key=lambda d: d.index)
+    if len(data) != n:
+        raise ValueError(f"임베딩 응답 개수 불일치 (요청={n}, 응답={len(data)})")
+    return np.asarray([d.embedding for d in data], dtype="float32")
+
+
+class EmbeddingBackend:
+    """
+    백엔드 인터페이스
+    - embed(texts) → (B, D) float32 (정규화는 Embeddings 가 담당)
+    - aembed(texts) → 같은 결과의 async 버전 (기본: to_thread)
+    - remote: 네트워크 호출 여부 (False 면 캐시/재시도 생략)
+    """
+    name: str = ""
+    remote: bool = True
+    dim: int | None = None
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        return await asyncio.to_thread(self.embed, texts)
+
+
+class OpenAIBackend(EmbeddingBackend):
+    def __init__(self, model: str, dimensions: int | None = None):
+        key = os.getenv("OPENAI_API_KEY")
+        if not key :
+            raise EnvironmentError("OPENAI_API_KEY not found in environment")
+        self.name = model
+        self.dim = dimensions
+        self.client = OpenAI(api_key=key)
+        self._api_key = key
+        self._kwargs = {"dimensions": dimensions} if dimensions else {}
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        resp = self.client.embeddings.create(model=self.name, input=texts, **self._kwargs)
+        return _response_matrix(resp, len(texts))
+
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        client, sem = _async_shared(self._api_key)
+        async with sem:
+            resp = await client.embeddings.create(model=self.name, input=texts, **self._kwargs)
+        return _response_matrix(resp, len(texts))
+
+
+class HashingBackend(EmbeddingBackend):
+    """
+    문자 n-gram 해싱 벡터라이저 (feature hashing + 부호 해시 + sublinear tf)
+    - 프로세스/머신이 달라도 같은 입력 → 같은 벡터 (Python hash() 대신 고정 곱셈 해시 사용)
+    - 한글은 음절 단위 2~3-gram 만으로도 어휘 겹침을 어느 정도 반영
+    """
+    remote = False
+    _MULT = np.uint64(1000003)
+    _MIX = np.uint64(0x9E3779B97F4A7C15)
+
+    def __init__(self, dim: int = 1536, ngrams: Tuple[int, ...] = (1, 2, 3)):
+        self.name = f"{LOCAL_HASH_PREFIX}{dim}"
+        self.dim = dim
+        self.ngrams = ngrams
+
+    def _vector(self, text: str) -> np.ndarray:
+        text = re.sub(r"\s+", " ", text.lower()).strip()
+        cps = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        vec = np.zeros(self.dim, dtype=np.float64)
+        for n in self.ngrams:
+            m = len(cps) - n + 1
+            if m <= 0:
+                continue
+            h = np.full(m, n, dtype=np.uint64)
+            for k in range(n):
+                h = h * self._MULT + cps[k:k + m]  # uint64 오버플로 = mod 2^64 (의도된 동작)
+            h = h * self._MIX
+            idx = (h >> np.uint64(33)) % np.uint64(self.dim)
+            sign = np.where((h >> np.uint64(17)) & np.uint64(1), 1.0, -1.0)
+            vec += np.bincount(idx.astype(np.int64), weights=sign, minlength=self.dim)
+        return np.sign(vec) * np.log1p(np.abs(vec))
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        with np.errstate(over="ignore"):
+            return np.vstack([self._vector(t) for t in texts]).astype("float32")
+
+
+# 모델 기본 출력 차원 (dimensions 미지정 시) — 인덱스 호환성 확인을 API 호출 없이 하기 위함
+MODEL_DIMS = {"text-embedding-3-small": 1536, "text-embedding-3-large": 3072, "text-embedding-ada-002": 1536}
+
+
+def model_dim(model: str, dimensions: int | None = None) -> int | None:
+    """모델 출력 차원 (알 수 없는 모델이면 None)"""
+    if dimensions:
+        return dimensions
+    if model.startswith(LOCAL_HASH_PREFIX):
+        try:
+            return int(model[len(LOCAL_HASH_PREFIX):])
+        except ValueError:
+            return None
+    return MODEL_DIMS.get(model)
+
+
+def make_backend(model: str, dimensions: int | None = None) -> EmbeddingBackend:
+    """모델명으로 백엔드 선택: "local-hash-<dim>" → HashingBackend, 그 외 → OpenAIBackend"""
+    if model.startswith(LOCAL_HASH_PREFIX):
+        try:
+            dim = int(model[len(LOCAL_HASH_PREFIX):])
+        except ValueError:
+            raise ValueError(f"로컬 해시 모델명 형식은 {LOCAL_HASH_PREFIX}<dim> 입니다: {model}")
+        return HashingBackend(dimensions or dim)
+    return OpenAIBackend(model, dimensions)
@@ -0,0 +1,429 @@
+# -*- coding: utf-8 -*-
+"""
+인덱스 빌드 벤치마크 (단계별 시간/처리량/peak RSS → JSON)
+- 단계: extract(PDF/텍스트 읽기) → clean(clean_text) → chunk → embed → faiss_add → save
+- 임베딩은 기본 local-hash 백엔드 (네트워크/API 키 없이 재현 가능)
+- 코퍼스: --paths 로 지정한 fixture(기본 data/raw) 또는 --synthetic N 으로 생성한 txt N개
+- --out 으로 JSON 저장, --baseline 으로 이전 결과와 단계별 비교 (커밋 간 회귀 확인)
+- --dims 256 512 ...: 단계 측정 대신 차원 축소 리포트 (전체 차원 대비 recall@k / 벡터 크기 / 검색 시간)
+  · truncate: 앞 d 성분만 남기고 재정규화 (= text-embedding-3-* API 의 dimensions 파라미터)
+  · pca     : 코퍼스 벡터로 PCA 학습 후 투영 (= build_index --pca_dim)
+- --ann flat ivf ivfpq hnsw auto: ANN 인덱스 리포트 (Flat 대비 recall@k / 질의 지연 p50·p99 / 빌드 시간 / 크기)
+  · --vectors N 이면 코퍼스 대신 군집형 합성 벡터 N개 (수백만 규모 확인용)
+  · --nprobe 8 32 ... / --ef_search 32 128 ... 로 검색 파라미터 스윕
+  · --sq none fp16 sq8: 종류마다 스칼라 양자화 변형 추가, --rescore N: 후보 top_k*N 을 float32 로 재채점
+
+실행 예:
+python -m student.day2.impl.bench --paths data/raw --out bench.json
+python -m student.day2.impl.bench --synthetic 200 --doc_chars 20000 --baseline bench.json
+python -m student.day2.impl.bench --paths data/raw --model text-embedding-3-small --dims 256 512 1024
+python -m student.day2.impl.bench --vectors 1000000 --dim 768 --ann flat ivf ivfpq hnsw --nprobe 8 32 128
+python -m student.day2.impl.bench --paths data/raw --ann flat hnsw --sq none fp16 sq8 --rescore 4
+"""
+
+import os, sys, json, time, random, tempfile, platform, subprocess
+from typing import Dict, Any, List
+import numpy as np
+import faiss
+
+from student.day2.impl.ingest import (collect_files, _extract_part, join_pages, clean_text, chunk_structured,
+                                      _fixed_bounds, batched, CHUNK_TOKENS)
+from student.day2.impl.embeddings import Embeddings
+from student.day2.impl.store import FaissStore, resolve_ann, rescore
+from student.day2.impl.docstore import DOCS_NAME
+from student.day2.impl.tokens import count_tokens
+
+STAGES = ("extract", "clean", "chunk", "embed", "faiss_add", "save")
+
+_WORDS_KO = ("의료", "인공지능", "규제", "기기", "허가", "임상", "데이터", "안전성", "유효성", "심사",
+             "가이드라인", "소프트웨어", "위험", "관리", "평가", "개인정보", "보호", "책임", "기준", "검증")
+_WORDS_EN = ("model", "device", "risk", "clinical", "approval", "data", "software", "safety", "audit", "policy")
+
+
+def peak_rss_mb() -> float | None:
+    """프로세스 peak RSS (MB). resource 가 없는 Windows 는 psutil 이 있으면 현재 RSS, 없으면 None"""
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024  # macOS 는 bytes, 그 외 KB
+    except ImportError:
+        pass
+    try:
+        import psutil  # pip install psutil (선택)
+        mem = psutil.Process().memory_info()
+        return getattr(mem, "peak_wset", mem.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def make_synthetic(root: str, n_docs: int, doc_chars: int, seed: int = 0) -> List[str]:
+    """문단/문장 구조가 있는 한·영 혼합 txt 코퍼스 생성 (seed 고정 → 매번 동일)"""
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    out = []
+    for d in range(n_docs):
+        paras, size = [], 0
+        while size < doc_chars:
+            sents = []
+            for _ in range(rng.randint(3, 8)):
+                words = [rng.choice(_WORDS_KO if rng.random() < 0.8 else _WORDS_EN) for _ in range(rng.randint(6, 16))]
+                sents.append(" ".join(words) + rng.choice(("다.", ".", "다.", "?")))
+            p = " ".join(sents)
+            paras.append(p)
+            size += len(p) + 2
+        fp = os.path.join(root, f"doc_{d:05d}.txt")
+        with open(fp, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(paras)[:doc_chars])
+        out.append(fp)
+    return out
+
+
+class _Timer:
+    def __init__(self):
+        self.seconds = {s: 0.0 for s in STAGES}
+
+    def run(self, stage: str, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        self.seconds[stage] += time.perf_counter() - t0
+        return out
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _load_items(paths: List[str], chunker: str, chunk_tokens: int, timer: _Timer) -> tuple:
+    """extract → clean → chunk 를 직렬 실행. 반환: (files, 문서 수, 페이지 수, 청크 리스트)"""
+    files = collect_files(paths)
+    n_pages = n_docs = 0
+    items: List[Dict[str, Any]] = []
+
+    for fp in files:
+        raw = timer.run("extract", _extract_part, fp)
+        if raw is None:
+            continue
+        n_docs += 1
+        if fp.lower().endswith(".pdf"):
+            n_pages += len(raw)
+            text, _ = timer.run("clean", join_pages, raw)
+        else:
+            text = timer.run("clean", clean_text, raw[0])
+        if chunker == "structured":
+            bounds = timer.run("chunk", chunk_structured, text, target_tokens=chunk_tokens)
+        else:
+            bounds = timer.run("chunk", _fixed_bounds, text)
+        for i, (s, e) in enumerate(bounds):
+            items.append({"id": f"{fp}::chunk_{i:04d}", "text": text[s:e], "meta": {"path": fp, "chunk": i}})
+    if not items:
+        raise ValueError(f"벤치마크 코퍼스가 비어있습니다: {paths}")
+    return files, n_docs, n_pages, items
+
+
+def run_benchmark(paths: List[str], model: str = "local-hash-1536", batch_size: int = 128,
+                  chunker: str = "fixed", chunk_tokens: int = CHUNK_TOKENS) -> Dict[str, Any]:
+    """
+    build_index 와 같은 순서로 파이프라인을 직렬 실행하며 단계별 시간 측정
+    (병렬 추출/캐시/dedup 은 끄고 단계 자체 비용만 측정)
+    """
+    timer = _Timer()
+    files, n_docs, n_pages, items = _load_items(paths, chunker, chunk_tokens, timer)
+    n_bytes = sum(os.path.getsize(fp) for fp in files)
+    n_tokens = sum(count_tokens(it["text"]) for it in items)
+
+    emb = Embeddings(model, batch_size)
+    store: FaissStore | None = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for batch in batched(items, batch_size):
+            vecs = timer.run("embed", emb.encode, [it["text"] for it in batch])
+            if store is None:
+                store = FaissStore(vecs.shape[1], os.path.join(tmp, "faiss.index"), os.path.join(tmp, DOCS_NAME))
+            timer.run("faiss_add", store.add, vecs, batch)
+        timer.run("save", store.save)
+        index_bytes = sum(os.path.getsize(os.path.join(tmp, n)) for n in os.listdir(tmp))
+
+    units = {"extract": ("files", len(files)), "clean": ("docs", n_docs), "chunk": ("docs", n_docs),
+             "embed": ("chunks", len(items)), "faiss_add": ("chunks", len(items)), "save": ("chunks", len(items))}
+    stages = {}
+    for s in STAGES:
+        sec = timer.seconds[s]
+        unit, n = units[s]
+        stages[s] = {"seconds": round(sec, 4), "unit": unit, "per_sec": round(n / sec, 1) if sec > 0 else None}
+    stages["extract"]["mb_per_sec"] = round(n_bytes / 1e6 / timer.seconds["extract"], 2) if timer.seconds["extract"] else None
+    stages["embed"]["tokens_per_sec"] = round(n_tokens / timer.seconds["embed"], 1) if timer.seconds["embed"] else None
+
+    rss = peak_rss_mb()
+    return {
+        "commit": _git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"paths": paths, "model": model, "batch_size": batch_size, "chunker": chunker,
+                   "chunk_tokens": chunk_tokens if chunker == "structured" else None},
+        "corpus": {"files": len(files), "docs": n_docs, "bytes": n_bytes, "pages": n_pages,
+                   "chunks": len(items), "tokens": n_tokens, "dim": store.dim, "index_bytes": index_bytes},
+        "stages": stages,
+        "total_seconds": round(sum(timer.seconds.values()), 4),
+        "peak_rss_mb": round(rss, 1) if rss is not None else None,
+    }
+
+
+def _topk(base: np.ndarray, queries: np.ndarray, q_idx: np.ndarray, k: int) -> tuple:
+    """자기 자신을 제외한 top-k id 와 질의당 검색 시간(ms)"""
+    index = faiss.IndexFlatIP(base.shape[1])
+    index.add(base)
+    t0 = time.perf_counter()
+    _, I = index.search(queries, k + 1)
+    ms = (time.perf_counter() - t0) * 1000 / len(queries)
+    out = np.empty((len(queries), k), dtype="int64")
+    for r, (row, self_id) in enumerate(zip(I, q_idx)):
+        row = row[row != self_id][:k]
+        out[r, :len(row)] = row
+        out[r, len(row):] = -1
+    return out, ms
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+def run_dims_report(paths: List[str], dims: List[int], model: str = "local-hash-1536", batch_size: int = 128,
+                    chunker: str = "fixed", chunk_tokens: int = CHUNK_TOKENS, k: int = 10,
+                    n_queries: int = 200, seed: int = 0) -> Dict[str, Any]:
+    """
+    전체 차원 Flat 검색 결과를 정답으로 두고, 축소 차원별 recall@k / 벡터 바이트 / 질의당 검색 ms 측정
+    - 질의: 코퍼스 청크 벡터 중 n_queries 개 (자기 자신은 결과에서 제외)
+    """
+    files, _, _, items = _load_items(paths, chunker, chunk_tokens, _Timer())
+    X = Embeddings(model, batch_size).encode([it["text"] for it in items])
+    full_dim = X.shape[1]
+    rng = np.random.default_rng(seed)
+    q_idx = rng.choice(len(X), size=min(n_queries, len(X)), replace=False)
+    k = min(k, len(X) - 1)
+    truth, full_ms = _topk(X, X[q_idx], q_idx, k)
+
+    def recall(pred: np.ndarray) -> float:
+        return float(np.mean([len(set(p) & set(t)) / k for p, t in zip(pred, truth)]))
+
+    rows = [{"method": "full", "dim": full_dim, "recall": 1.0, "bytes_per_vec": full_dim * 4,
+             "index_mb": round(X.nbytes / 1e6, 2), "search_ms": round(full_ms, 3)}]
+    for d in sorted(dims):
+        if d >= full_dim:
+            continue
+        Xt = _normalize(np.ascontiguousarray(X[:, :d]))
+        pred, ms = _topk(Xt, Xt[q_idx], q_idx, k)
+        rows.append({"method": "truncate", "dim": d, "recall": round(recall(pred), 4), "bytes_per_vec": d * 4,
+                     "index_mb": round(Xt.nbytes / 1e6, 2), "search_ms": round(ms, 3)})
+        if len(X) < d:
+            rows.append({"method": "pca", "dim": d, "recall": None, "bytes_per_vec": d * 4,
+                         "skipped": f"PCA 학습 벡터 부족 ({len(X)} < {d})"})
+            continue
+        pca = faiss.PCAMatrix(full_dim, d)
+        pca.train(X)
+        Xp = _normalize(pca.apply(X))
+        pred, ms = _topk(Xp, Xp[q_idx], q_idx, k)
+        rows.append({"method": "pca", "dim": d, "recall": round(recall(pred), 4), "bytes_per_vec": d * 4,
+                     "index_mb": round(Xp.nbytes / 1e6, 2), "search_ms": round(ms, 3)})
+
+    return {
+        "commit": _git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"paths": paths, "model": model, "chunker": chunker, "k": k, "queries": len(q_idx)},
+        "corpus": {"files": len(files), "chunks": len(items), "dim": full_dim},
+        "dims": rows,
+    }
+
+
+def make_clustered(n: int, dim: int, seed: int = 0, n_clusters: int | None = None) -> np.ndarray:
+    """임베딩처럼 군집 구조가 있는 L2 정규화 합성 벡터 (균일 난수는 ANN recall 을 과소평가)"""
+    rng = np.random.default_rng(seed)
+    n_clusters = n_clusters or max(int(np.sqrt(n)), 1)
+    centers = _normalize(rng.standard_normal((n_clusters, dim)).astype("float32"))
+    out = np.empty((n, dim), dtype="float32")
+    for s in range(0, n, 65536):  # 큰 n 에서도 임시 배열을 작게
+        m = min(65536, n - s)
+        out[s:s + m] = centers[rng.integers(0, n_clusters, m)] + rng.standard_normal((m, dim)) / np.sqrt(dim)
+    return _normalize(out)
+
+
+def run_ann_report(paths: List[str], kinds: List[str], model: str = "local-hash-1536", batch_size: int = 128,
+                   chunker: str = "fixed", chunk_tokens: int = CHUNK_TOKENS, k: int = 10, n_queries: int = 200,
+                   seed: int = 0, vectors: int = 0, dim: int = 768, train_sample: int = 20000,
+                   nprobes: List[int] | None = None, ef_searches: List[int] | None = None,
+                   sqs: List[str | None] | None = None, rescore_n: int = 0) -> Dict[str, Any]:
+    """
+    Flat 검색 결과를 정답으로 두고 인덱스 종류별 recall@k, 질의 1건 지연 p50/p99(ms), 빌드(학습+추가) 시간, 크기 측정
+    - 인덱스는 FaissStore 로 생성 (build_index 와 같은 resolve_ann 기본값 / 학습 표본 크기)
+    - sqs: 종류마다 시험할 양자화 (None=float32). rescore_n>0 이면 후보 top_k*N 을 X(float32)로 재채점한 결과
+    - 질의: 코퍼스 벡터 중 n_queries 개 (자기 자신은 결과에서 제외)
+    """
+    if vectors > 0:
+        X, n_files = make_clustered(vectors, dim, seed), 0
+    else:
+        files, _, _, items = _load_items(paths, chunker, chunk_tokens, _Timer())
+        X, n_files = Embeddings(model, batch_size).encode([it["text"] for it in items]), len(files)
+    n, d = X.shape
+    rng = np.random.default_rng(seed)
+    q_idx = rng.choice(n, size=min(n_queries, n), replace=False)
+    k = min(k, n - 1)
+    truth, _ = _topk(X, X[q_idx], q_idx, k)
+    sample = X[rng.choice(n, size=min(train_sample, n), replace=False)]
+
+    rows = []
+    variants = [(kind, sq) for kind in kinds for sq in (sqs or [None]) if not (sq and kind == "ivfpq")]
+    for kind, sq in variants:
+        ann = resolve_ann({"type": kind, "sq": sq, "rescore": rescore_n}, n, d, len(sample))
+        store = FaissStore(d, "", "", ann=ann)
+        t0 = time.perf_counter()
+        if not store.is_trained:
+            store.train(sample)
+        store.index.add_with_ids(X, np.arange(n, dtype="int64"))
+        build_s = time.perf_counter() - t0
+        index_mb = faiss.serialize_index(store.index).nbytes / 1e6
+        sweep = [{}]
+        if "nprobe" in ann and nprobes:
+            sweep = [{"nprobe": v} for v in nprobes if v <= ann["nlist"]]
+        elif "ef_search" in ann and ef_searches:
+            sweep = [{"ef_search": v} for v in ef_searches]
+        for params in sweep:
+            store.set_search_params(**params)
+            lat, pred = [], np.empty((len(q_idx), k), dtype="int64")
+            for r, qi in enumerate(q_idx):
+                t0 = time.perf_counter()
+                _, I = store.index.search(X[qi:qi + 1], (k + 1) * max(rescore_n, 1))
+                cand = I[0][(I[0] != qi) & (I[0] != -1)]
+                if rescore_n:
+                    cand = rescore(X[qi], cand, X[cand], k)[1]
+                lat.append((time.perf_counter() - t0) * 1000)
+                row = cand[:k]
+                pred[r, :len(row)] = row
+                pred[r, len(row):] = -1
+            recall = float(np.mean([len(set(p) & set(t)) / k for p, t in zip(pred, truth)]))
+            rows.append({"kind": kind, "ann": dict(store.ann), "recall": round(recall, 4),
+                         "p50_ms": round(float(np.percentile(lat, 50)), 3),
+                         "p99_ms": round(float(np.percentile(lat, 99)), 3),
+                         "build_s": round(build_s, 3), "index_mb": round(index_mb, 2)})
+
+    return {
+        "commit": _git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"paths": paths if vectors <= 0 else [f"clustered:{vectors}x{dim}:seed{seed}"],
+                   "model": model if vectors <= 0 else None, "k": k, "queries": len(q_idx),
+                   "train_sample": len(sample)},
+        "corpus": {"files": n_files, "chunks": n, "dim": d},
+        "ann": rows,
+    }
+
+
+def print_ann_report(result: Dict[str, Any]):
+    c = result["corpus"]
+    print(f"[ANN] vectors={c['chunks']} dim={c['dim']} recall@{result['config']['k']} vs flat "
+          f"over {result['config']['queries']} queries")
+    print(f"{'index':<48} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'MB':>8}")
+    for r in result["ann"]:
+        name = ",".join(f"{k}={v}" if k != "type" else v for k, v in r["ann"].items())
+        if r["kind"] != r["ann"]["type"]:
+            name = f"{r['kind']}→{name}"
+        print(f"{name:<48} {r['recall']:>7.3f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} "
+              f"{r['build_s']:>8.2f} {r['index_mb']:>8.1f}")
+
+
+def print_dims_report(result: Dict[str, Any]):
+    c = result["corpus"]
+    print(f"[DIMS] chunks={c['chunks']} full_dim={c['dim']} model={result['config']['model']} "
+          f"recall@{result['config']['k']} over {result['config']['queries']} queries")
+    print(f"{'method':<9} {'dim':>5} {'recall':>7} {'B/vec':>6} {'index MB':>9} {'ms/query':>9}")
+    for r in result["dims"]:
+        if r.get("recall") is None:
+            print(f"{r['method']:<9} {r['dim']:>5}  - ({r.get('skipped')})")
+            continue
+        print(f"{r['method']:<9} {r['dim']:>5} {r['recall']:>7.3f} {r['bytes_per_vec']:>6} "
+              f"{r['index_mb']:>9.2f} {r['search_ms']:>9.3f}")
+
+
+def print_report(result: Dict[str, Any], baseline: Dict[str, Any] | None = None):
+    c = result["corpus"]
+    print(f"[BENCH] files={c['files']} pages={c['pages']} chunks={c['chunks']} tokens={c['tokens']} "
+          f"dim={c['dim']} model={result['config']['model']}")
+    if baseline and baseline.get("config") != result["config"]:
+        print(f"[WARN] baseline 설정이 다릅니다 ({baseline.get('commit')}): {baseline.get('config')}")
+    head = f"{'stage':<10} {'sec':>9} {'rate':>18}"
+    print(head + (f" {'baseline':>9} {'Δ%':>7}" if baseline else ""))
+    for s in STAGES:
+        st = result["stages"][s]
+        rate = f"{st['per_sec']} {st['unit']}/s" if st["per_sec"] is not None else "-"
+        line = f"{s:<10} {st['seconds']:>9.4f} {rate:>18}"
+        if baseline and s in baseline.get("stages", {}):
+            b = baseline["stages"][s]["seconds"]
+            delta = f"{(st['seconds'] - b) / b * 100:+.1f}" if b else "-"
+            line += f" {b:>9.4f} {delta:>7}"
+        print(line)
+    print(f"{'total':<10} {result['total_seconds']:>9.4f}   peak RSS {result['peak_rss_mb']} MB")
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Day2 인덱스 빌드 단계별 벤치마크")
+    ap.add_argument("--paths", nargs="+", default=["data/raw"], help="fixture 코퍼스 경로")
+    ap.add_argument("--synthetic", type=int, default=0, help="합성 txt 문서 N개로 측정 (0=fixture 사용)")
+    ap.add_argument("--doc_chars", type=int, default=20000, help="합성 문서 1개 글자 수")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--model", default="local-hash-1536", help="기본 오프라인 임베더 (API 측정 시 실제 모델명)")
+    ap.add_argument("--batch_size", type=int, default=128)
+    ap.add_argument("--chunker", choices=["fixed", "structured"], default="fixed")
+    ap.add_argument("--chunk_tokens", type=int, default=CHUNK_TOKENS)
+    ap.add_argument("--out", default=None, help="결과 JSON 경로")
+    ap.add_argument("--baseline", default=None, help="비교할 이전 결과 JSON")
+    ap.add_argument("--dims", type=int, nargs="+", default=None, help="차원 축소 리포트 (예: 256 512 1024)")
+    ap.add_argument("--k", type=int, default=10, help="--dims recall@k")
+    ap.add_argument("--queries", type=int, default=200, help="--dims / --ann 질의 수")
+    ap.add_argument("--ann", nargs="+", default=None, choices=["flat", "ivf", "ivfpq", "hnsw", "auto"],
+                    help="ANN 인덱스 리포트 (예: flat ivf ivfpq hnsw)")
+    ap.add_argument("--vectors", type=int, default=0, help="--ann 에 코퍼스 대신 군집형 합성 벡터 N개 사용")
+    ap.add_argument("--dim", type=int, default=768, help="--vectors 차원")
+    ap.add_argument("--train_sample", type=int, default=20000, help="--ann IVF/PQ 학습 표본 수")
+    ap.add_argument("--nprobe", type=int, nargs="+", default=None, help="--ann IVF nprobe 스윕")
+    ap.add_argument("--ef_search", type=int, nargs="+", default=None, help="--ann HNSW efSearch 스윕")
+    ap.add_argument("--sq", nargs="+", default=None, choices=["none", "fp16", "sq8"], help="--ann 양자화 변형")
+    ap.add_argument("--rescore", type=int, default=0, help="--ann 후보 top_k*N float32 재채점 (0=끔)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.paths
+        if args.synthetic > 0:
+            make_synthetic(tmp, args.synthetic, args.doc_chars, args.seed)
+            paths = [tmp]
+        if args.ann:
+            result = run_ann_report(paths, args.ann, args.model, args.batch_size, args.chunker, args.chunk_tokens,
+                                    args.k, args.queries, args.seed, args.vectors, args.dim, args.train_sample,
+                                    args.nprobe, args.ef_search,
+                                    [None if q == "none" else q for q in args.sq] if args.sq else None, args.rescore)
+        elif args.dims:
+            result = run_dims_report(paths, args.dims, args.model, args.batch_size, args.chunker, args.chunk_tokens,
+                                     args.k, args.queries, args.seed)
+        else:
+            result = run_benchmark(paths, args.model, args.batch_size, args.chunker, args.chunk_tokens)
+    if args.synthetic > 0 and not args.vectors:
+        result["config"]["paths"] = [f"synthetic:{args.synthetic}x{args.doc_chars}:seed{args.seed}"]
+
+    if args.ann or args.dims:
+        print_ann_report(result) if args.ann else print_dims_report(result)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            print(f"[INFO] saved: {args.out}")
+        sys.exit(0)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"[INFO] saved: {args.out}")
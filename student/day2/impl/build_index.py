@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
 """
 Day2 인덱싱 엔트리포인트
-- 목표: 코퍼스 생성 → 임베딩 → FAISS 저장 + docs.jsonl 저장
+- 목표: 코퍼스 생성 → 임베딩 → FAISS 저장 + 문서 저장(docs.bin, mmap 바이너리 문서 테이블)
 """
-import os, sys
+import os, sys, shutil
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
 if PROJECT_ROOT not in sys.path:
    sys.path.insert(0, PROJECT_ROOT)
@@ -14,51 +14,354 @@ except Exception:
    pass
 
 import argparse, numpy as np
-from typing import List
+from typing import List, Dict, Any
 
-from student.day2.impl.ingest import build_corpus, save_docs_jsonl
-from student.day2.impl.embeddings import Embeddings
-from student.day2.impl.store import FaissStore  # 제공됨
+from student.day2.impl.ingest import iter_corpus, collect_files, batched, CHUNK_TOKENS
+from student.day2.impl.embeddings import Embeddings, default_embed_cache_path
+from student.day2.impl.store import FaissStore, stable_id, resolve_ann, quant_report  # 제공됨
+from student.day2.impl.docstore import DocTableWriter, docs_file, vecs_path, DOCS_NAME
+from student.day2.impl.manifest import load_manifest, save_manifest, diff_files, file_entry, MANIFEST_NAME
+from student.day2.impl.text_cache import TextCache
+from student.day2.impl.embed_cache import EmbeddingCache
+from student.day2.impl.dedup import NearDupFilter, dedup_stream, load_aliases, save_aliases, orphaned_files
+from student.day2.impl.versions import (resolve_index_dir, begin_version, abort_version, publish, KEEP_VERSIONS,
+                                        VERSION_INFO)
 
 
-def build_index(paths: List[str], index_dir: str, model: str | None = None, batch_size: int = 128):
+def _reset_counts(entries: Dict[str, Dict[str, Any]]):
+   for e in entries.values():
+      e["chunks"] = 0
+
+
+def _count_chunk(entries: Dict[str, Dict[str, Any]], item: Dict[str, Any]):
+   """파일 엔트리별 인덱스에 들어간 청크 수 (삭제는 FaissStore.remove(path) 가 id 로 처리)"""
+   e = entries.get(item["meta"]["path"])
+   if e is not None:
+      e["chunks"] += 1
+
+
+def _mark_incomplete(entries: Dict[str, Dict[str, Any]], failed: List[str]):
+   """추출 실패/일부만 추출된 파일 → 매니페스트에 incomplete 표시 (다음 증분 빌드에서 다시 처리)"""
+   for fp in failed:
+      if fp in entries:
+         entries[fp]["incomplete"] = True
+         print(f"[WARN] 추출 불완전 → 다음 증분 빌드에서 다시 처리: {fp}")
+
+
+def _index_meta(model: str | None, chunking: Dict[str, Any], reduce: Dict[str, Any]) -> Dict[str, Any]:
+   """index_meta.json 에 남길 빌드 설정 (dim/ntotal/빌드 시각은 FaissStore.save 가 채움)"""
+   return {"model": model or "text-embedding-3-small", "dimensions": reduce.get("dimensions"),
+           "pca_dim": reduce.get("pca_dim"), "chunking": chunking}
+
+
+def _ann_request(ann: Dict[str, Any] | None) -> Dict[str, Any]:
    """
-   절차:
-      1) corpus = build_corpus(paths)
-         - [{"id":..., "text":..., "meta":{...}}, ...]
-      2) texts = [item["text"] for item in corpus]
-      3) emb = Embeddings(model=model, batch_size=batch_size)
-         vecs = emb.encode(texts)  # (N, D) L2 정규화된 np.ndarray
-      4) index_path = os.path.join(index_dir, "faiss.index")
-         docs_path  = os.path.join(index_dir, "docs.jsonl")
-      5) store = FaissStore(dim=vecs.shape[1], index_path=index_path, docs_path=docs_path)
-         store.add(vecs, corpus); store.save()
-      6) save_docs_jsonl(corpus, docs_path)
+   manifest 에 남기는 인덱스 구조 요청 (검색 파라미터 nprobe/ef_search 는 재빌드 없이 바뀌므로 제외)
+   rescore 는 원본 벡터(docs.vecs) 보관 여부만 구조로 봄 — 배수는 증분 빌드에서 바로 반영
    """
-   print(f"[INFO] corpus building from: {paths}")
-   corpus = build_corpus(paths)
-   print(f"[INFO] corpus size: {len(corpus)}")
+   ann = ann or {}
+   req = {k: ann[k] for k in ("type", "nlist", "sq") if ann.get(k) is not None} or {"type": "flat"}
+   if ann.get("rescore"):
+      req["rescore"] = True
+   return req
 
 
-   if not corpus :
-      raise ValueError("build corpus 결과가 비어있습니다.")
-   texts = [item["text"] for item in corpus]
+def _estimate_chunks(n_seen: int, seen: set, entries: Dict[str, Dict[str, Any]]) -> int:
+   """지금까지 본 파일 바이트 비율로 전체 청크 수 추정 (auto / nlist 결정용)"""
+   total = sum(e["size"] for e in entries.values())
+   done = sum(entries[fp]["size"] for fp in seen if fp in entries)
+   return int(n_seen * total / done) if done else n_seen
 
-   emb = Embeddings(model, batch_size)
-   vecs = emb.encode(texts)
-   print(f"[INFO] embeddings shape: {vecs.shape}")
 
-   os.makedirs(index_dir, exist_ok=True)
-   index_path = os.path.join(index_dir, "faiss.index")
-   docs_path = os.path.join(index_dir, "docs.jsonl")
+def _clone_version(src_dir: str, dst_dir: str):
+   """게시된 버전 파일은 바뀌지 않으므로 하드링크로 복제 (불가하면 복사). manifest 는 호출 측이 새로 씀"""
+   for n in os.listdir(src_dir):
+      src = os.path.join(src_dir, n)
+      if n in (VERSION_INFO, MANIFEST_NAME) or not os.path.isfile(src):
+         continue
+      try:
+         os.link(src, os.path.join(dst_dir, n))
+      except OSError:
+         shutil.copy2(src, os.path.join(dst_dir, n))
 
-   store= FaissStore(dim=vecs.shape[1], index_path=index_path, docs_path=docs_path)
-   store.add(vecs, corpus)
-   print(f"[INFO] saving to: {index_path}, {docs_path}")
+
+def _build_incremental(paths: List[str], index_dir: str, model: str | None, batch_size: int, workers: int | None,
+                       cache: TextCache | None, concurrency: int = 1,
+                       emb_cache: EmbeddingCache | None = None, dedup: bool = True,
+                       chunking: Dict[str, Any] | None = None, keep_versions: int = KEEP_VERSIONS,
+                       reduce: Dict[str, Any] | None = None, ann: Dict[str, Any] | None = None) -> bool:
+   """
+   매니페스트 기반 증분 빌드. 증분이 불가능하면 False 반환(→ 전체 빌드).
+   - 인덱스 종류는 기존 버전 그대로 (auto 도 전체 빌드 때만 다시 고름). 요청한 종류/nlist 가 다르면 전체 빌드
+   - 현재 버전(CURRENT)을 읽어 새 버전 디렉토리에 결과를 쓰고 publish (현재 버전은 건드리지 않음)
+   - 새로 추가/변경된 파일만 추출·임베딩 후 append
+   - 변경/삭제된 파일의 기존 청크는 FaissStore.remove(path) 로 id 기준 삭제 (재임베딩 없음)
+   - dedup: 기존 청크 지문(meta.simhash)으로 seed 후 신규 청크의 근접 중복 제거.
+     제거되는 파일의 청크를 대표로 삼던 별칭이 있는 파일은 함께 재처리
+   """
+   src_dir = resolve_index_dir(index_dir)
+   index_path = os.path.join(src_dir, "faiss.index")
+   docs_path = docs_file(src_dir)
+   manifest = load_manifest(src_dir)
+   emb_model = model or "text-embedding-3-small"
+   if not manifest["files"] or not (os.path.exists(index_path) and os.path.exists(docs_path)):
+      print("[INFO] manifest/인덱스 없음 → 전체 빌드")
+      return False
+   if manifest.get("model") != emb_model:
+      print(f"[INFO] 임베딩 모델 변경({manifest.get('model')} → {emb_model}) → 전체 빌드")
+      return False
+   chunking = chunking or {"chunker": "fixed"}
+   if manifest.get("chunking", {"chunker": "fixed"}) != chunking:
+      print(f"[INFO] 청크 설정 변경({manifest.get('chunking')} → {chunking}) → 전체 빌드")
+      return False
+   reduce = reduce or {"dimensions": None, "pca_dim": None}
+   if manifest.get("reduce", {"dimensions": None, "pca_dim": None}) != reduce:
+      print(f"[INFO] 차원 축소 설정 변경({manifest.get('reduce')} → {reduce}) → 전체 빌드")
+      return False
+   if manifest.get("ann", {"type": "flat"}) != _ann_request(ann):
+      print(f"[INFO] 인덱스 종류 변경({manifest.get('ann')} → {_ann_request(ann)}) → 전체 빌드")
+      return False
+
+   files = collect_files(paths)
+   changed, stale, entries = diff_files(manifest["files"], files)
+   aliases = load_aliases(src_dir)
+   for fp in orphaned_files(aliases, stale):
+      print(f"[INFO] 대표 청크가 제거되어 재처리: {fp}")
+      changed.append(fp)
+      stale.append(fp)
+   aliases = [a for a in aliases
+              if a.get("path") not in stale and a["alias_of"].rsplit("::", 1)[0] not in stale]
+   print(f"[INFO] incremental: 변경/추가 {len(changed)}개, 제거 {len(stale)}개, 전체 {len(files)}개")
+   if not changed and not stale:
+      if entries != manifest["files"]:
+         # 내용은 같고 mtime 만 바뀐 파일 → 매니페스트만 갱신한 새 버전 (인덱스 파일은 하드링크)
+         out_dir = begin_version(index_dir)
+         try:
+            _clone_version(src_dir, out_dir)
+            manifest["files"] = entries
+            save_manifest(manifest, out_dir)
+            publish(index_dir, out_dir, keep_versions)
+         except BaseException:
+            abort_version(out_dir)
+            raise
+      print("[INFO] 변경 없음 → 인덱스 유지")
+      return True
+
+   out_dir = begin_version(index_dir)
+   try:
+      _apply_incremental(index_dir, src_dir, out_dir, manifest, entries, changed, stale, aliases, model,
+                         batch_size, workers, cache, concurrency, emb_cache, dedup, chunking, keep_versions,
+                         reduce, ann or {})
+   except BaseException:
+      abort_version(out_dir)
+      raise
+   return True
+
+
+def _apply_incremental(index_dir: str, src_dir: str, out_dir: str, manifest: Dict[str, Any],
+                       entries: Dict[str, Dict[str, Any]], changed: List[str], stale: List[str],
+                       aliases: List[Dict[str, Any]], model: str | None, batch_size: int, workers: int | None,
+                       cache: TextCache | None, concurrency: int, emb_cache: EmbeddingCache | None,
+                       dedup: bool, chunking: Dict[str, Any], keep_versions: int, reduce: Dict[str, Any],
+                       ann: Dict[str, Any]):
+   """src_dir(현재 버전) + 변경분 → out_dir(스테이징) 에 기록 후 publish"""
+   store = FaissStore.load(os.path.join(src_dir, "faiss.index"), docs_file(src_dir))
+   store.set_search_params(ann.get("nprobe"), ann.get("ef_search"), ann.get("rescore"))
+   store.index_path = os.path.join(out_dir, "faiss.index")
+   store.docs_path = os.path.join(out_dir, DOCS_NAME)  # 예전 docs.jsonl 인덱스도 여기서 docs.bin 으로 전환
+   removed = sum(store.remove(fp) for fp in stale)
+   store.compact()
+
+   fresh = {fp: entries[fp] for fp in changed}
+   _reset_counts(fresh)
+   offset = store.index.ntotal
+   failed: List[str] = []
+   if changed:
+      emb = Embeddings(model, batch_size, concurrency=concurrency, dimensions=reduce["dimensions"], cache=emb_cache)
+      chunks = iter_corpus(changed, workers=workers, cache=cache, failed=failed, **chunking)
+      if dedup:
+         filt = NearDupFilter()
+         filt.seed(store.docs.values())
+         chunks = dedup_stream(chunks, filt, aliases)
+      for batch in batched(chunks, batch_size * concurrency):
+         vecs = emb.encode([item["text"] for item in batch])
+         if vecs.shape[1] != store.dim:
+            raise ValueError(f"임베딩 차원이 인덱스와 다릅니다. (index={store.dim}, embedder={vecs.shape[1]})")
+         for item in batch:
+            _count_chunk(fresh, item)
+         store.add(vecs, batch)
+   _mark_incomplete(entries, failed)
+   print(f"[INFO] 신규 청크: {store.index.ntotal - offset}, 제거 청크: {removed}")
+
+   print(f"[INFO] saving to: {out_dir} (ntotal={store.index.ntotal})")
+   store.meta = _index_meta(model, chunking, reduce)
    store.save()
-   print("[INFO] done.")
+   save_aliases(aliases, out_dir)
+   manifest["files"] = entries
+   save_manifest(manifest, out_dir)
+   publish(index_dir, out_dir, keep_versions)
+   print("[INFO] done (incremental).")
+
+
+def build_index(paths: List[str], index_dir: str, model: str | None = None, batch_size: int = 128, incremental: bool = False,
+                workers: int | None = 1, text_cache_mb: int = 512, concurrency: int = 1,
+                embed_cache_mb: int = 1024, dedup: bool = True, chunker: str = "fixed",
+                chunk_tokens: int = CHUNK_TOKENS, keep_versions: int = KEEP_VERSIONS,
+                dimensions: int | None = None, pca_dim: int | None = None, train_sample: int = 20000,
+                index_type: str = "flat", nlist: int | None = None, nprobe: int | None = None,
+                ef_search: int | None = None, sq: str | None = None, rescore: int = 0):
+   """
+   결과는 <index_dir>/versions/<버전>/ 에 기록 후 CURRENT 포인터 교체 (versions.py 참고)
+   절차 (스트리밍: 메모리 사용량은 코퍼스 크기가 아니라 batch_size 에 비례):
+      1) iter_corpus(paths) 로 청크를 하나씩 생성
+         - {"id":..., "text":..., "meta":{...}}
+      2) batch_size 개씩 묶어 emb.encode(texts)  # (B, D) L2 정규화된 np.ndarray
+      3) 첫 배치에서 dim 확인 → store = FaissStore(dim, index_path, docs_path)
+      4) 배치마다 store.add(vecs, batch, keep_docs=False) + DocTableWriter 로 docs.bin 에 스트리밍 기록
+      5) store.save(write_docs=False), 문서 테이블 마무리 (행 테이블/id 정렬/경로표)
+      6) manifest.json 저장 (파일별 size/mtime/sha256/청크 수)
+         + index_meta.json (모델/차원/정규화/청크 설정/빌드 시각 → 질의 측 호환성 확인용)
+      7) publish: 체크섬 기록 → CURRENT 교체 → 오래된 버전 정리(keep_versions 개 유지)
+      - incremental=True 면 manifest 비교 후 변경분만 처리 (불가하면 전체 빌드)
+      - workers: PDF 추출 프로세스 수 (1=직렬, 0=CPU 수)
+      - concurrency: 동시 임베딩 요청 수 (batch_size*concurrency 청크씩 묶어 encode 에 전달)
+      - text_cache_mb: PDF 추출 텍스트 캐시 상한(MB, 0=끔). 위치: <index_dir 상위>/.cache/text
+      - embed_cache_mb: 임베딩 캐시 상한(MB, 0=끔). 위치: <index_dir 상위>/.cache/embeddings.sqlite
+      - dedup: 청크→임베딩 사이에서 근접 중복 청크(SimHash) 제거, 별칭은 aliases.jsonl 에 기록
+      - chunker: "fixed"(1200자/200자 겹침) | "structured"(문단·문장 경계, 목표 chunk_tokens 토큰)
+      - dimensions: 임베딩 API 출력 차원 (text-embedding-3-* 의 Matryoshka 축소, 예: 256/512)
+      - pca_dim: 빌드 시 처음 train_sample 개 벡터로 PCA 학습 → pca_dim 차원으로 저장 (질의에도 자동 적용)
+        어느 쪽이 나은지는 bench --dims 리포트(recall vs 크기) 참고
+      - index_type: flat | ivf | ivfpq | hnsw | auto (store.py INDEX_TYPES 참고)
+        ivf/ivfpq/auto 는 처음 train_sample 개 벡터를 모은 뒤 (파일 바이트 비율로 전체 청크 수를 추정해)
+        종류·nlist 를 정하고 그 표본으로 학습. auto: 5만 이하 flat, 200만 이하 ivf, 그 이상 ivfpq
+        nprobe / ef_search 는 index_meta.json 에 저장돼 질의 시 그대로 적용 (recall/지연은 bench --ann 참고)
+      - sq: fp16 | sq8 — 벡터를 2바이트/1바이트 성분으로 저장 (float32 대비 1/2, 1/4. ivfpq 와는 같이 못 씀)
+        rescore=N: 양자화 점수로 top_k*N 후보 → float32 원본(docs.vecs, 디스크 mmap)으로 재채점해 정확한 순서
+        빌드 시 학습 표본으로 float32 대비 recall@10 변화 / 벡터당 바이트를 계산해 출력하고 index_meta.json "quant" 에 기록
+   """
+   chunking: Dict[str, Any] = {"chunker": chunker}
+   if chunker == "structured":
+      chunking["chunk_tokens"] = chunk_tokens
+   reduce = {"dimensions": dimensions, "pca_dim": pca_dim}
+   ann = {"type": index_type, "nlist": nlist, "nprobe": nprobe, "ef_search": ef_search, "sq": sq, "rescore": rescore}
+
+   cache = None
+   if text_cache_mb > 0:
+      cache_root = os.path.join(os.path.dirname(os.path.abspath(index_dir)), ".cache", "text")
+      cache = TextCache(cache_root, max_bytes=text_cache_mb * 1024 * 1024)
+   emb_cache = None
+   if embed_cache_mb > 0:
+      emb_cache = EmbeddingCache(default_embed_cache_path(index_dir), max_bytes=embed_cache_mb * 1024 * 1024)
+
+   try:
+      if incremental and _build_incremental(paths, index_dir, model, batch_size, workers, cache, concurrency,
+                                            emb_cache, dedup, chunking, keep_versions, reduce, ann):
+         return
+
+      out_dir = begin_version(index_dir)
+      try:
+         _build_full(paths, index_dir, out_dir, model, batch_size, workers, cache, concurrency, emb_cache, dedup,
+                     chunking, keep_versions, reduce, ann, train_sample)
+      except BaseException:
+         abort_version(out_dir)
+         raise
+   finally:
+      if emb_cache is not None:
+         emb_cache.close()  # watch 데몬에서 반복 호출돼도 SQLite 연결이 쌓이지 않도록
+
+
+def _build_full(paths: List[str], index_dir: str, out_dir: str, model: str | None, batch_size: int,
+                workers: int | None, cache: TextCache | None, concurrency: int, emb_cache: EmbeddingCache | None,
+                dedup: bool, chunking: Dict[str, Any], keep_versions: int, reduce: Dict[str, Any],
+                ann: Dict[str, Any], train_sample: int = 20000):
+   print(f"[INFO] corpus building from: {paths}")
+   files = collect_files(paths)
+   entries = {fp: file_entry(fp) for fp in files}
+   _reset_counts(entries)
+
+   # 청크 → batch_size 단위 임베딩 → 인덱스 추가 + docs.bin 에 한 건씩 기록
+   # (코퍼스 전체 리스트 / 전체 벡터 vstack 을 메모리에 두지 않음)
+   index_path = os.path.join(out_dir, "faiss.index")
+   docs_path = os.path.join(out_dir, DOCS_NAME)
+
+   emb = Embeddings(model, batch_size, concurrency=concurrency, dimensions=reduce["dimensions"], cache=emb_cache)
+   store: FaissStore | None = None
+   pending: List[tuple] = []  # 인덱스 생성(종류 결정/학습) 전까지 모아 둔 (vecs, batch)
+   seen: set = set()          # 청크가 나온 파일 (전체 청크 수 추정용)
+   # 학습 표본이 필요하면 train_sample 개를 모은 뒤 인덱스 생성, 아니면 첫 배치에서 바로
+   need_sample = bool(reduce["pca_dim"] or ann.get("sq")) or ann["type"] in ("auto", "ivf", "ivfpq")
+   keep_raw = bool(ann.get("rescore"))  # 재채점용 float32 원본을 docs.vecs 에 기록
+   quant: Dict[str, Any] = {}
+
+   def open_store(n_est: int):
+      nonlocal store
+      dim = pending[0][0].shape[1]
+      stored = reduce["pca_dim"] if reduce["pca_dim"] and reduce["pca_dim"] < dim else dim
+      n_train = sum(len(v) for v, _ in pending)
+      store = FaissStore(dim=dim, index_path=index_path, docs_path=docs_path, pca_dim=reduce["pca_dim"],
+                         ann=resolve_ann(ann, n_est, stored, n_train))
+      print(f"[INFO] 인덱스: {store.ann} (예상 청크 {n_est})")
+      x = np.vstack([v for v, _ in pending]) if not store.is_trained or store.ann.get("sq") else None
+      if not store.is_trained:
+         print(f"[INFO] 학습: {len(x)}개 벡터, {store.dim} → {store.stored_dim}차원")
+         store.train(x)
+      if store.ann.get("sq") and len(x) > 1:
+         quant.update(quant_report(x, store.ann, reduce["pca_dim"]))
+         print(f"[INFO] 양자화 {store.ann['sq']}: 표본 {quant['sample']}개 기준 recall@{quant['k']} "
+               f"float32 {quant['recall_float32']} → {quant['recall_quant']} "
+               f"(재채점 {quant.get('recall_rescored', '-')}, Δ {quant['recall_delta']:+}), "
+               f"벡터당 {quant['bytes_per_vec_float32']}B → {quant['bytes_per_vec_quant']}B")
+      for v, b in pending:
+         store.add(v, b, keep_docs=False)
+      pending.clear()
 
-   save_docs_jsonl(corpus, docs_path)
+   failed: List[str] = []  # 추출 실패/불완전 파일 (매니페스트에 incomplete 표시)
+   chunks = iter_corpus(files, workers=workers, cache=cache, failed=failed, **chunking)
+   aliases: List[Dict[str, Any]] = []
+   filt = NearDupFilter()
+   if dedup:
+      chunks = dedup_stream(chunks, filt, aliases)
+   with DocTableWriter(docs_path) as writer:
+      for batch in batched(chunks, batch_size * concurrency):
+         vecs = emb.encode([item["text"] for item in batch])
+         for item, vec in zip(batch, vecs):
+            _count_chunk(entries, item)
+            writer.write(stable_id(item["id"]), item, vec if keep_raw else None)
+            seen.add(item["meta"]["path"])
+         if store is None:
+            pending.append((vecs, batch))
+            n_seen = sum(len(v) for v, _ in pending)
+            if not need_sample or n_seen >= train_sample:
+               open_store(_estimate_chunks(n_seen, seen, entries))
+            continue
+         store.add(vecs, batch, keep_docs=False)
+         print(f"[INFO] embedded: {store.index.ntotal}")
+   _mark_incomplete(entries, failed)
+
+   if store is None:
+      if not pending:
+         raise ValueError("build corpus 결과가 비어있습니다.")
+      open_store(sum(len(v) for v, _ in pending))  # 표본보다 작은 코퍼스 → 청크 수 확정
+   print(f"[INFO] corpus size: {store.index.ntotal}, dim: {store.dim} (저장 {store.stored_dim}), "
+         f"근접 중복 제거: {filt.dropped}")
+
+   print(f"[INFO] saving to: {out_dir}")
+   store.meta = _index_meta(model, chunking, reduce)
+   if quant:
+      store.meta["quant"] = quant
+   store.save(write_docs=False)
+   size = f"[INFO] faiss.index {os.path.getsize(index_path) / 1e6:.1f}MB (메모리 상주)"
+   if keep_raw:
+      size += f", docs.vecs {os.path.getsize(vecs_path(docs_path)) / 1e6:.1f}MB (디스크 mmap, 재채점 후보만 읽음)"
+   print(size)
+   save_aliases(aliases, out_dir)
+   save_manifest({"model": model or "text-embedding-3-small", "chunking": chunking, "reduce": reduce,
+                  "ann": _ann_request(ann), "files": entries}, out_dir)
+   publish(index_dir, out_dir, keep_versions)
+   print("[INFO] done.")
+   if emb_cache is not None:
+      print(f"[INFO] embedding cache: {emb_cache.stats()}")
    # ----------------------------------------------------------------------------
    # TODO[DAY2-I-01] 구현 지침
    #  - corpus = build_corpus(paths)
@@ -77,6 +380,29 @@ def build_index(paths: List[str], index_dir: str, model: str | None = None, batc
 
 python -m student.day2.impl.build_index --paths data/raw --index_dir indices/day2 --model text-embedding-3-small --batch_size 128
 
+# 변경/추가된 파일만 반영 (manifest.json 기준)
+python -m student.day2.impl.build_index --paths data/raw --index_dir indices/day2 --incremental
+
+# PDF 추출 병렬화 (0 = CPU 수)
+python -m student.day2.impl.build_index --paths data/raw --index_dir indices/day2 --workers 0
+
+# 데몬 모드: data/raw 를 감시하다 변경되면 증분 빌드 (2초 폴링, 5초 debounce)
+python -m student.day2.impl.build_index --paths data/raw --index_dir indices/day2 --watch
+
+# 256차원 인덱스 (API dimensions) / 1536 → 256 PCA (bench --dims 로 recall 비교 후 선택)
+python -m student.day2.impl.build_index --paths data/raw --index_dir indices/day2 --dimensions 256
+python -m student.day2.impl.build_index --paths data/raw --index_dir indices/day2 --pca_dim 256
+
+# ANN 인덱스 (코퍼스 크기로 자동 선택 / 직접 지정). 비교는 bench --ann flat ivf ivfpq hnsw
+python -m student.day2.impl.build_index --paths data/raw --index_dir indices/day2 --index_type auto
+python -m student.day2.impl.build_index --paths data/raw --index_dir indices/day2 --index_type ivf --nlist 1024 --nprobe 32
+
+# 8bit 스칼라 양자화 (인덱스 1/4) + 상위 후보 float32 재채점
+python -m student.day2.impl.build_index --paths data/raw --index_dir indices/day2 --sq sq8 --rescore 4
+
+# 결과: indices/day2/versions/<버전>/ + indices/day2/CURRENT (최근 3개 버전 유지)
+python -m student.day2.impl.build_index --paths data/raw --index_dir indices/day2 --keep_versions 5
+
 """
 
 if __name__ == "__main__":
@@ -85,10 +411,46 @@ if __name__ == "__main__":
    ap.add_argument("--index_dir", default="indices/day2")
    ap.add_argument("--model", default=None)
    ap.add_argument("--batch_size", type=int, default=128)
+   ap.add_argument("--incremental", action="store_true", help="manifest.json 기준 변경분만 재임베딩")
+   ap.add_argument("--workers", type=int, default=1, help="텍스트 추출 프로세스 수 (1=직렬, 0=CPU 수)")
+   ap.add_argument("--text_cache_mb", type=int, default=512, help="PDF 추출 텍스트 캐시 상한 MB (0=끔)")
+   ap.add_argument("--embed_cache_mb", type=int, default=1024, help="임베딩 캐시 상한 MB (0=끔)")
+   ap.add_argument("--chunker", choices=["fixed", "structured"], default="fixed",
+                   help="fixed: 1200자 슬라이딩 윈도우 / structured: 문단·문장 경계 기반")
+   ap.add_argument("--chunk_tokens", type=int, default=CHUNK_TOKENS, help="structured 청커 목표 토큰 수")
+   ap.add_argument("--dimensions", type=int, default=None, help="임베딩 API 출력 차원 (text-embedding-3-*)")
+   ap.add_argument("--pca_dim", type=int, default=None, help="빌드 시 PCA 로 줄일 저장 차원")
+   ap.add_argument("--train_sample", "--pca_train", dest="train_sample", type=int, default=20000,
+                   help="PCA / IVF / PQ 학습에 쓸 벡터 수")
+   ap.add_argument("--index_type", choices=["flat", "ivf", "ivfpq", "hnsw", "auto"], default="flat",
+                   help="FAISS 인덱스 종류 (auto: 코퍼스 크기로 선택)")
+   ap.add_argument("--nlist", type=int, default=None, help="IVF 군집 수 (기본 4·√N)")
+   ap.add_argument("--nprobe", type=int, default=None, help="IVF 검색 시 탐색할 군집 수 (기본 nlist/16)")
+   ap.add_argument("--ef_search", type=int, default=None, help="HNSW 검색 후보 수 (기본 64)")
+   ap.add_argument("--sq", choices=["fp16", "sq8"], default=None, help="벡터 스칼라 양자화 (flat/ivf/hnsw)")
+   ap.add_argument("--rescore", type=int, default=0,
+                   help="top_k*N 후보를 float32 원본으로 재채점 (0=끔, 원본은 docs.vecs 로 저장)")
+   ap.add_argument("--keep_versions", type=int, default=KEEP_VERSIONS, help="남겨 둘 인덱스 버전 수")
+   ap.add_argument("--watch", action="store_true", help="경로를 감시하며 변경 시 증분 빌드 (데몬 모드)")
+   ap.add_argument("--interval", type=float, default=2.0, help="--watch 폴링 간격(초)")
+   ap.add_argument("--debounce", type=float, default=5.0, help="--watch 마지막 변경 후 빌드까지 대기(초)")
+   ap.add_argument("--no_dedup", action="store_true", help="근접 중복 청크 제거 끄기")
+   ap.add_argument("--concurrency", type=int, default=1, help="동시 임베딩 요청 수 (429/타임아웃 시 자동 축소)")
    args = ap.parse_args()
 
    os.makedirs(args.index_dir, exist_ok=True)
-   build_index(args.paths, args.index_dir, args.model, args.batch_size)
+   opts = dict(model=args.model, batch_size=args.batch_size, workers=args.workers,
+               text_cache_mb=args.text_cache_mb, concurrency=args.concurrency,
+               embed_cache_mb=args.embed_cache_mb, dedup=not args.no_dedup,
+               chunker=args.chunker, chunk_tokens=args.chunk_tokens, keep_versions=args.keep_versions,
+               dimensions=args.dimensions, pca_dim=args.pca_dim, train_sample=args.train_sample,
+               index_type=args.index_type, nlist=args.nlist, nprobe=args.nprobe, ef_search=args.ef_search,
+               sq=args.sq, rescore=args.rescore)
+   if args.watch:
+      from student.day2.impl.watch import watch
+      watch(args.paths, args.index_dir, interval=args.interval, debounce=args.debounce, **opts)
+   else:
+      build_index(args.paths, args.index_dir, incremental=args.incremental, **opts)
 
    # ----------------------------------------------------------------------------
    # TODO[DAY2-I-02] 구현 지침
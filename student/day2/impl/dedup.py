@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+근접 중복 청크 제거 (청크 → 임베딩 사이 단계)
+- SimHash(64bit, 문자 4-gram 셔글) 로 청크 지문 계산
+- 해밍 거리 <= max_distance 면 같은 청크로 보고 임베딩 생략, 대표 청크의 별칭(alias)으로 기록
+- 후보 탐색은 16bit x 4 밴드 LSH (거리 3 이하면 최소 한 밴드는 완전히 일치)
+  → 전체 쌍 비교 없이 O(N)
+"""
+
+import os, re, json
+from typing import Dict, List, Any
+import numpy as np
+
+ALIASES_NAME = "aliases.jsonl"
+
+SHINGLE = 4
+_MULT = np.uint64(1000003)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_BITS = np.arange(64, dtype=np.uint64)
+
+
+def simhash(text: str, shingle: int = SHINGLE) -> int:
+    """공백 무시 문자 shingle-gram 기반 64bit SimHash"""
+    s = re.sub(r"\s+", "", text.lower())
+    cps = np.frombuffer(s.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    m = len(cps) - shingle + 1
+    if m <= 0:
+        cps = np.pad(cps, (0, shingle - len(cps)))
+        m = 1
+    with np.errstate(over="ignore"):
+        h = np.zeros(m, dtype=np.uint64)
+        for k in range(shingle):
+            h = h * _MULT + cps[k:k + m]
+        h = h * _MIX
+    bits = ((h[:, None] >> _BITS) & np.uint64(1)).astype(np.int32)
+    votes = bits.sum(axis=0) * 2 - m
+    return int(sum(1 << i for i in range(64) if votes[i] > 0))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDupFilter:
+    """
+    청크 지문 저장소
+    - check(item): 근접 중복이면 대표 청크 id 반환, 아니면 등록 후 None
+    - item["meta"]["simhash"] 에 지문(hex) 기록 → 증분 빌드 때 seed 로 재사용
+    """
+    def __init__(self, max_distance: int = 3):
+        if max_distance > 3:
+            raise ValueError("밴드 4개 LSH 는 해밍 거리 3 이하만 보장합니다.")
+        self.max_distance = max_distance
+        self._bands: List[Dict[int, List[int]]] = [{} for _ in range(4)]
+        self._sigs: List[int] = []
+        self._ids: List[str] = []
+        self.dropped = 0
+
+    def _find(self, sig: int) -> str | None:
+        seen = set()
+        for b in range(4):
+            for j in self._bands[b].get((sig >> (16 * b)) & 0xFFFF, ()):
+                if j in seen:
+                    continue
+                seen.add(j)
+                if hamming(sig, self._sigs[j]) <= self.max_distance:
+                    return self._ids[j]
+        return None
+
+    def add(self, item_id: str, sig: int):
+        j = len(self._sigs)
+        self._sigs.append(sig)
+        self._ids.append(item_id)
+        for b in range(4):
+            self._bands[b].setdefault((sig >> (16 * b)) & 0xFFFF, []).append(j)
+
+    def seed(self, items: List[Dict[str, Any]]):
+        """기존 인덱스 문서(meta.simhash 보유)로 초기화"""
+        for it in items:
+            sig = (it.get("meta") or {}).get("simhash")
+            if sig:
+                self.add(it["id"], int(sig, 16))
+
+    def check(self, item: Dict[str, Any]) -> str | None:
+        sig = simhash(item["text"])
+        dup = self._find(sig)
+        if dup is not None:
+            self.dropped += 1
+            return dup
+        item.setdefault("meta", {})["simhash"] = f"{sig:016x}"
+        self.add(item["id"], sig)
+        return None
+
+
+def dedup_stream(items, filt: NearDupFilter, aliases: List[Dict[str, Any]]):
+    """
+    청크 스트림에서 근접 중복을 걸러냄 (대표 청크만 yield)
+    - 걸러진 청크는 aliases 에 {"id", "alias_of", "path", "chunk", "page"} 로 기록
+    """
+    for it in items:
+        dup = filt.check(it)
+        if dup is None:
+            yield it
+            continue
+        meta = it.get("meta", {})
+        aliases.append({"id": it["id"], "alias_of": dup, "path": meta.get("path"),
+                        "chunk": meta.get("chunk"), "page": meta.get("page")})
+
+
+def load_aliases(index_dir: str) -> List[Dict[str, Any]]:
+    p = os.path.join(index_dir, ALIASES_NAME)
+    if not os.path.exists(p):
+        return []
+    with open(p, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_aliases(aliases: List[Dict[str, Any]], index_dir: str):
+    p = os.path.join(index_dir, ALIASES_NAME)
+    with open(p + ".tmp", "w", encoding="utf-8") as f:
+        for a in aliases:
+            f.write(json.dumps(a, ensure_ascii=False) + "\n")
+    os.replace(p + ".tmp", p)
+
+
+def orphaned_files(aliases: List[Dict[str, Any]], stale: List[str]) -> List[str]:
+    """
+    stale 파일의 청크를 대표로 삼던 별칭 청크가 있는 (stale 이 아닌) 파일 목록
+    → 대표가 사라지므로 이 파일들도 다시 처리해야 함 (연쇄적으로 고정점까지)
+    """
+    stale_set = set(stale)
+    out: List[str] = []
+    grew = True
+    while grew:
+        grew = False
+        for a in aliases:
+            canon_path = a["alias_of"].rsplit("::", 1)[0]
+            if canon_path in stale_set and a.get("path") and a["path"] not in stale_set:
+                stale_set.add(a["path"])
+                out.append(a["path"])
+                grew = True
+    return out
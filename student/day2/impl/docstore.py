@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+바이너리 문서 저장소 (docs.jsonl 대체, memory-mapped)
+- docs.bin        : 행마다 [청크 텍스트 UTF-8][추가 메타 JSON UTF-8] 를 이어 붙인 blob
+- docs.rows.npy   : 고정폭 행 테이블 (ROW_DTYPE: id, blob 오프셋/길이, path 번호, chunk, page, page_end)
+- docs.order.npy  : id 오름차순 정렬 순열 → id 조회는 이분 탐색 (O(log N), 로드 시 정렬 없음)
+- docs.paths.json : path 번호 → 문자열 (파일 수만큼이라 작음)
+- docs.vecs       : (선택) 행 순서대로 float32 원본 임베딩 — 양자화 인덱스의 shortlist 재채점용 (store.py rescore)
+- 로드는 mmap 만 (파싱 없음) → 로드 시간/RSS 가 코퍼스 크기와 무관, 여러 워커가 OS 페이지 캐시 공유
+- 검색 결과로 돌려주는 top-k 행만 디코딩
+"""
+
+import os, json, mmap
+from typing import Dict, Any, List, Iterator, MutableMapping
+import numpy as np
+
+DOCS_NAME = "docs.bin"
+LEGACY_DOCS_NAME = "docs.jsonl"
+
+ROW_DTYPE = np.dtype([
+    ("id", "<i8"), ("off", "<u8"), ("text_len", "<u4"), ("meta_len", "<u4"),
+    ("path", "<i4"), ("chunk", "<i4"), ("page", "<i4"), ("page_end", "<i4"),
+])
+
+_COLUMN_META = ("path", "chunk", "page", "page_end")  # 열로 저장되는 meta 키 (나머지는 JSON)
+
+
+def docs_file(index_dir: str) -> str:
+    """디렉토리의 문서 파일: docs.bin, 없고 예전 docs.jsonl 만 있으면 그것"""
+    p = os.path.join(index_dir, DOCS_NAME)
+    legacy = os.path.join(index_dir, LEGACY_DOCS_NAME)
+    return legacy if not os.path.exists(p) and os.path.exists(legacy) else p
+
+
+def _sidecars(docs_path: str) -> tuple:
+    base = docs_path[:-len(".bin")] if docs_path.endswith(".bin") else docs_path
+    return base + ".rows.npy", base + ".order.npy", base + ".paths.json"
+
+
+def vecs_path(docs_path: str) -> str:
+    base = docs_path[:-len(".bin")] if docs_path.endswith(".bin") else docs_path
+    return base + ".vecs"
+
+
+class DocTableWriter:
+    """
+    문서를 한 건씩 받아 docs.bin 에 스트리밍 기록, close() 시 행 테이블/정렬 순열/경로표 저장
+    - 모두 .tmp 로 쓴 뒤 close() 에서 os.replace (같은 경로를 mmap 중인 DocTable 이 있어도 안전)
+    - write(..., vec=) 로 원본 벡터를 주면 docs.vecs 에 같은 행 순서로 기록 (주려면 모든 행에)
+    """
+
+    def __init__(self, docs_path: str):
+        self.docs_path = docs_path
+        self._blob = open(docs_path + ".tmp", "wb")
+        self._off = 0
+        self._rows: List[tuple] = []
+        self._paths: Dict[str, int] = {}
+        self._vecs = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._blob.close()  # 실패 시 .tmp 만 남음 (스테이징 디렉토리와 함께 정리됨)
+            if self._vecs is not None:
+                self._vecs.close()
+
+    def write(self, doc_id: int, item: Dict[str, Any], vec: np.ndarray | None = None):
+        meta = dict(item.get("meta") or {})
+        path = meta.pop("path", None)
+        cols = [meta.pop(k, None) for k in _COLUMN_META[1:]]
+        extra = {"id": item["id"]}
+        if meta:
+            extra["meta"] = meta
+        for k, v in item.items():
+            if k not in ("id", "text", "meta"):
+                extra[k] = v
+        text = item["text"].encode("utf-8")
+        mjson = json.dumps(extra, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._blob.write(text)
+        self._blob.write(mjson)
+        pidx = -1 if path is None else self._paths.setdefault(path, len(self._paths))
+        self._rows.append((doc_id, self._off, len(text), len(mjson), pidx,
+                           *[-1 if v is None else int(v) for v in cols]))
+        self._off += len(text) + len(mjson)
+        if vec is not None:
+            if self._vecs is None:
+                if len(self._rows) > 1:
+                    raise ValueError("원본 벡터는 모든 행에 주어야 합니다.")
+                self._vecs = open(vecs_path(self.docs_path) + ".tmp", "wb")
+            self._vecs.write(np.asarray(vec, dtype="<f4").tobytes())
+        elif self._vecs is not None:
+            raise ValueError("원본 벡터는 모든 행에 주어야 합니다.")
+
+    def close(self):
+        self._blob.close()
+        if self._vecs is not None:
+            self._vecs.close()
+            os.replace(vecs_path(self.docs_path) + ".tmp", vecs_path(self.docs_path))
+        elif os.path.exists(vecs_path(self.docs_path)):
+            os.remove(vecs_path(self.docs_path))  # 같은 경로에 다시 쓸 때 예전 벡터가 어긋나지 않도록
+        rows_path, order_path, paths_path = _sidecars(self.docs_path)
+        rows = np.array(self._rows, dtype=ROW_DTYPE)
+        with open(rows_path + ".tmp", "wb") as f:
+            np.save(f, rows)
+        with open(order_path + ".tmp", "wb") as f:
+            np.save(f, np.argsort(rows["id"], kind="stable").astype("<i8"))
+        with open(paths_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(sorted(self._paths, key=self._paths.get), f, ensure_ascii=False)
+        for p in (rows_path, order_path, paths_path, self.docs_path):
+            os.replace(p + ".tmp", p)
+
+
+def write_doc_table(docs_path: str, docs: Dict[int, Dict[str, Any]] | Iterator[tuple]):
+    """docs: {id: doc} 또는 (id, doc) / (id, doc, vec) 튜플 iterator"""
+    with DocTableWriter(docs_path) as w:
+        for row in (docs.items() if isinstance(docs, dict) else docs):
+            w.write(*row)
+
+
+class DocTable:
+    """읽기 전용 mmap 테이블. get(id) 는 해당 행만 디코딩"""
+
+    def __init__(self, docs_path: str):
+        rows_path, order_path, paths_path = _sidecars(docs_path)
+        self.rows = np.load(rows_path, mmap_mode="r")
+        self.order = np.load(order_path, mmap_mode="r")
+        with open(paths_path, "r", encoding="utf-8") as f:
+            self.paths: List[str] = json.load(f)
+        self._path_idx = {p: i for i, p in enumerate(self.paths)}
+        self._file = open(docs_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self.blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        vp = vecs_path(docs_path)
+        self.vectors: np.ndarray | None = None  # (행 수, dim) float32 mmap, 없으면 None
+        if len(self.rows) and os.path.exists(vp) and os.path.getsize(vp):
+            self.vectors = np.memmap(vp, dtype="<f4", mode="r").reshape(len(self.rows), -1)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def row_of(self, doc_id: int) -> int:
+        """id → 행 번호 (없으면 -1)"""
+        # ids[order] 전체를 만들지 않고 이분 탐색 (mmap 페이지 몇 개만 접근)
+        ids, lo, hi = self.rows["id"], 0, len(self.order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ids[self.order[mid]] < doc_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.order) and ids[self.order[lo]] == doc_id:
+            return int(self.order[lo])
+        return -1
+
+    def decode(self, r: int) -> Dict[str, Any]:
+        row = self.rows[r]
+        off, tl, ml = int(row["off"]), int(row["text_len"]), int(row["meta_len"])
+        text = bytes(self.blob[off:off + tl]).decode("utf-8")
+        extra = json.loads(bytes(self.blob[off + tl:off + tl + ml]))
+        meta: Dict[str, Any] = {}
+        if row["path"] >= 0:
+            meta["path"] = self.paths[row["path"]]
+        for k in _COLUMN_META[1:]:
+            if row[k] >= 0:
+                meta[k] = int(row[k])
+        meta.update(extra.pop("meta", {}))
+        doc = {"id": extra.pop("id"), "text": text, "meta": meta}
+        doc.update(extra)
+        return doc
+
+    def ids_for_path(self, path: str) -> List[int]:
+        p = self._path_idx.get(path)
+        if p is None:
+            return []
+        return self.rows["id"][np.flatnonzero(self.rows["path"] == p)].tolist()
+
+    def close(self):
+        self.vectors = None
+        if isinstance(self.blob, mmap.mmap):
+            self.blob.close()
+        self._file.close()
+
+
+class DocStore(MutableMapping):
+    """
+    {id: doc} 매핑 인터페이스 (FaissStore.docs)
+    - base: 디스크의 DocTable (읽기 전용, mmap) / overlay: 새로 추가된 문서 dict / removed: base 에서 지운 id
+    - vector(id): 원본 벡터 (overlay 는 set_vector 로 넣은 것, base 는 docs.vecs 행). 없으면 None
+    - 순회 순서 = base 행 순서(지운 것 제외) → overlay 삽입 순서 (= 인덱스 add 순서)
+    """
+
+    def __init__(self, base: DocTable | None = None):
+        self.base = base
+        self.overlay: Dict[int, Dict[str, Any]] = {}
+        self.removed: set[int] = set()
+        self._by_path: Dict[str, List[int]] = {}
+        self._vecs: Dict[int, np.ndarray] = {}
+
+    def __getitem__(self, doc_id: int) -> Dict[str, Any]:
+        doc = self.overlay.get(doc_id)
+        if doc is not None:
+            return doc
+        if self.base is not None and doc_id not in self.removed:
+            r = self.base.row_of(doc_id)
+            if r >= 0:
+                return self.base.decode(r)
+        raise KeyError(doc_id)
+
+    def __contains__(self, doc_id) -> bool:
+        if doc_id in self.overlay:
+            return True
+        return self.base is not None and doc_id not in self.removed and self.base.row_of(doc_id) >= 0
+
+    def __setitem__(self, doc_id: int, doc: Dict[str, Any]):
+        self.overlay[doc_id] = doc
+        path = (doc.get("meta") or {}).get("path")
+        if path is not None:
+            self._by_path.setdefault(path, []).append(doc_id)
+
+    def __delitem__(self, doc_id: int):
+        self._vecs.pop(doc_id, None)
+        if self.overlay.pop(doc_id, None) is not None:
+            return
+        if self.base is not None and doc_id not in self.removed and self.base.row_of(doc_id) >= 0:
+            self.removed.add(doc_id)
+            return
+        raise KeyError(doc_id)
+
+    def _base_rows(self) -> Iterator[int]:
+        if self.base is None:
+            return
+        ids = self.base.rows["id"]
+        for r in range(len(self.base)):
+            if not self.removed or int(ids[r]) not in self.removed:
+                yield r
+
+    def __iter__(self) -> Iterator[int]:
+        ids = self.base.rows["id"] if self.base is not None else None
+        for r in self._base_rows():
+            yield int(ids[r])
+        yield from list(self.overlay)
+
+    def __len__(self) -> int:
+        n = len(self.base) - len(self.removed) if self.base is not None else 0
+        return n + len(self.overlay)
+
+    def items(self):
+        ids = self.base.rows["id"] if self.base is not None else None
+        for r in self._base_rows():
+            yield int(ids[r]), self.base.decode(r)
+        yield from list(self.overlay.items())
+
+    def values(self):
+        for _, doc in self.items():
+            yield doc
+
+    def set_vector(self, doc_id: int, vec: np.ndarray):
+        self._vecs[doc_id] = vec
+
+    def vector(self, doc_id: int) -> np.ndarray | None:
+        vec = self._vecs.get(doc_id)
+        if vec is not None or doc_id in self.overlay:
+            return vec
+        if self.base is None or self.base.vectors is None or doc_id in self.removed:
+            return None
+        r = self.base.row_of(doc_id)
+        return self.base.vectors[r] if r >= 0 else None
+
+    def ids_for_path(self, path: str) -> List[int]:
+        out = [i for i in dict.fromkeys(self._by_path.get(path, [])) if i in self.overlay]
+        if self.base is not None:
+            out.extend(i for i in self.base.ids_for_path(path) if i not in self.removed)
+        return out
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+임베딩 캐시 (SQLite, content-addressed)
+- 키: (model, dimensions, sha256(text)) → 값: L2 정규화된 float32 벡터 blob
+- 재빌드/청크 파라미터 실험/반복 질의에서 같은 문자열은 API 호출 없이 재사용
+- 용량 상한(max_bytes) 초과 시 last_used 가 오래된 것부터 삭제 (LRU)
+- touch_interval>0: 히트의 last_used 갱신을 메모리에 모았다가 그 간격(초)마다 / put_many / close 때 한 번에 기록
+  (질의 경로에서 히트마다 UPDATE+commit 하지 않음)
+"""
+
+import os, time, sqlite3, hashlib, threading
+from typing import List, Dict
+import numpy as np
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str = "indices/.cache/embeddings.sqlite", max_bytes: int = 1024 * 1024 * 1024,
+                 touch_interval: float = 0.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self._touched: Dict[tuple, float] = {}  # (model, dims, sha) → 아직 기록 안 한 last_used
+        self._last_flush = time.time()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS emb (
+                model TEXT NOT NULL,
+                dims INTEGER NOT NULL,
+                sha TEXT NOT NULL,
+                vec BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, dims, sha)
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS emb_lru ON emb(last_used)")
+        self._conn.commit()
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM emb").fetchone()[0]
+
+    def get_many(self, model: str, dims: int, texts: List[str]) -> Dict[int, np.ndarray]:
+        """texts 중 캐시에 있는 것 → {입력 번호: 벡터}"""
+        shas = [text_sha256(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            uniq = list(dict.fromkeys(shas))
+            for i in range(0, len(uniq), 500):  # SQLite 변수 개수 제한 회피
+                part = uniq[i:i + 500]
+                q = f"SELECT sha, vec FROM emb WHERE model=? AND dims=? AND sha IN ({','.join('?' * len(part))})"
+                for sha, blob in self._conn.execute(q, [model, dims, *part]):
+                    found[sha] = np.frombuffer(blob, dtype="float32")
+            if found:
+                now = time.time()
+                self._touched.update({(model, dims, sha): now for sha in found})
+                if now - self._last_flush >= self.touch_interval:
+                    self._flush_touched()
+                    self._conn.commit()
+        out = {i: found[sha] for i, sha in enumerate(shas) if sha in found}
+        self.hits += len(out)
+        self.misses += len(texts) - len(out)
+        return out
+
+    def put_many(self, model: str, dims: int, texts: List[str], vecs: np.ndarray):
+        now = time.time()
+        rows = [(model, dims, text_sha256(t), np.asarray(v, dtype="float32").tobytes(), now)
+                for t, v in zip(texts, vecs)]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO emb VALUES (?, ?, ?, ?, ?)", rows)
+            self._flush_touched()
+            self._conn.commit()
+            inserted = self._conn.total_changes - before
+            if rows:
+                self._bytes += inserted * len(rows[0][3])
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _flush_touched(self):
+        """모아 둔 last_used 갱신 기록 (호출 측에서 lock 보유, commit 은 호출 측)"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE emb SET last_used=? WHERE model=? AND dims=? AND sha=?",
+                [(t, *key) for key, t in self._touched.items()],
+            )
+            self._touched.clear()
+        self._last_flush = time.time()
+
+    def _evict(self):
+        """상한의 90% 까지 오래된 항목 삭제 (호출 측에서 lock 보유)"""
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target:
+            n = self._conn.execute("SELECT COUNT(*) FROM emb").fetchone()[0]
+            if n == 0:
+                break
+            k = max(1, int((self._bytes - target) / (self._bytes / n)) + 1)
+            self._conn.execute(
+                "DELETE FROM emb WHERE rowid IN (SELECT rowid FROM emb ORDER BY last_used LIMIT ?)", (k,))
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM emb").fetchone()[0]
+        self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            n = self._conn.execute("SELECT COUNT(*) FROM emb").fetchone()[0]
+        return {"entries": n, "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
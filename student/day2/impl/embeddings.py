@@ -1,22 +1,91 @@
 # -*- coding: utf-8 -*-
 """
 OpenAI 임베딩 래퍼
-- 요구사항: 배치 인코딩, 재시도(backoff), L2 정규화
+- 요구사항: 배치 인코딩(배치당 1요청), 재시도(backoff), L2 정규화
+- 실제 벡터 생성은 backends.py (OpenAI / 로컬 해시) 에 위임
 """
 
-import os, time
-from typing import List
+import os, time, random, threading, asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any
 import numpy as np
 from httpx import ReadTimeout  # 선택: 재시도 구분용
-from openai import OpenAI
+from openai import RateLimitError, APITimeoutError
+
+from student.day2.impl.backends import make_backend, ASYNC_MAX_INFLIGHT
+from student.day2.impl.embed_cache import EmbeddingCache
+from student.day2.impl.tokens import (count_tokens, split_by_tokens, pack_batches, MAX_INPUT_TOKENS,
+                                      MAX_REQUEST_TOKENS, MAX_REQUEST_INPUTS)
+
+
+def default_embed_cache_path(index_dir: str) -> str:
+    """인덱스 디렉토리 상위의 .cache/embeddings.sqlite (예: indices/day2 → indices/.cache/embeddings.sqlite)"""
+    return os.path.join(os.path.dirname(os.path.abspath(index_dir)), ".cache", "embeddings.sqlite")
+
+
+def l2_normalize(mat: np.ndarray) -> np.ndarray:
+    """행 단위 L2 정규화 (벡터화, 0-나누기 방지용 작은 상수)"""
+    norms = np.linalg.norm(mat, axis=1, keepdims=True) + 1e-12
+    return (mat / norms).astype("float32", copy=False)
+
+
+def _is_throttled(e: Exception) -> bool:
+    """429(레이트 리밋) / 타임아웃 계열이면 True → 동시성 축소 대상"""
+    if isinstance(e, (RateLimitError, APITimeoutError, ReadTimeout)):
+        return True
+    return getattr(e, "status_code", None) == 429
+
+
+class AdaptiveConcurrency:
+    """
+    동시 요청 수 조절기 (AIMD)
+    - 429/타임아웃: limit 절반으로 축소
+    - 연속 성공 limit 회: limit + 1 (maximum 까지)
+    """
+    def __init__(self, initial: int, maximum: int):
+        self.maximum = max(1, maximum)
+        self.limit = max(1, min(initial, self.maximum))
+        self.inflight = 0
+        self._ok = 0
+        self._cv = threading.Condition()
+
+    def acquire(self):
+        with self._cv:
+            while self.inflight >= self.limit:
+                self._cv.wait()
+            self.inflight += 1
+
+    def release(self, throttled: bool = False):
+        with self._cv:
+            self.inflight -= 1
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+                self._ok = 0
+            else:
+                self._ok += 1
+                if self._ok >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self._ok = 0
+            self._cv.notify_all()
 
 
 class Embeddings:
-    def __init__(self, model: str | None = None, batch_size: int = 128, max_retries: int = 4):
+    def __init__(self, model: str | None = None, batch_size: int = 128, max_retries: int = 4,
+                 concurrency: int = 1, max_concurrency: int | None = None,
+                 max_batch_tokens: int = MAX_REQUEST_TOKENS, oversize: str = "truncate",
+                 dimensions: int | None = None, cache: EmbeddingCache | None = None):
         """
         - self.model 기본값: "text-embedding-3-small" 권장
         - self.batch_size, self.max_retries 저장
         - OpenAI 클라이언트 생성 (키는 환경변수 OPENAI_API_KEY)
+          단, model="local-hash-<dim>" 이면 네트워크 없는 로컬 해시 백엔드 (키 불필요)
+        - concurrency>1: 배치 여러 개를 동시에 요청 (429/타임아웃 시 자동 축소 후 다시 회복)
+          회복 상한 max_concurrency: None 이면 요청한 concurrency (그 이상으로는 늘리지 않음)
+        - 배치는 토큰 예산(max_batch_tokens)과 개수(batch_size) 둘 다 넘지 않게 패킹
+        - oversize: 입력 1개가 8191 토큰을 넘을 때 정책
+            "truncate"(앞부분만) | "split"(조각별 임베딩 후 토큰 가중 평균) | "error"
+        - dimensions: API 출력 차원 (None 이면 모델 기본값)
+        - cache: EmbeddingCache 주면 (model, dimensions, sha256(text)) 로 조회 → 미스만 API 전송
         """
         # ----------------------------------------------------------------------------
         # TODO[DAY2-E-01] 구현 지침
@@ -27,10 +96,17 @@ class Embeddings:
         self.model = model or 'text-embedding-3-small'
         self.batch_size = batch_size
         self.max_retries = max_retries
-        key = os.getenv("OPENAI_API_KEY")
-        if not key :
-            raise EnvironmentError("OPENAI_API_KEY not found in environment")
-        self.client = OpenAI(api_key=key)
+        self.backend = make_backend(self.model, dimensions)
+        self.client = getattr(self.backend, "client", None)  # OpenAI 백엔드일 때만
+        self.concurrency = concurrency
+        self.max_concurrency = concurrency if max_concurrency is None else max(concurrency, max_concurrency)
+        self.max_batch_tokens = max_batch_tokens
+        if oversize not in ("truncate", "split", "error"):
+            raise ValueError(f"oversize 정책은 truncate/split/error 중 하나: {oversize}")
+        self.oversize = oversize
+        self.dimensions = dimensions
+        self.cache = cache
+        self.last_stats: Dict[str, Any] = {}
         # raise NotImplementedError("TODO[DAY2-E-01]: Embeddings.__init__ 구성")
 
     def _embed_once(self, text: str) -> np.ndarray:
@@ -46,10 +122,8 @@ class Embeddings:
         #  - return vec
         # ----------------------------------------------------------------------------
         
-        # 1. OpenAI 임베딩 호출
-        resp = self.client.embeddings.create(model=self.model, input=text)
-        # 2. numpy 배열화 (float32)
-        vec = np.array(resp.data[0].embedding, dtype="float32")
+        # 1~2. 백엔드 임베딩 호출 → numpy 배열(float32)
+        vec = self._embed_batch([text])[0]
         # 3. L2 정규화 (0-나누기 방지용 작은 상수)
         norm = np.linalg.norm(vec) + 1e-12
         vec = vec / norm
@@ -58,6 +132,14 @@ class Embeddings:
         
         #raise NotImplementedError("TODO[DAY2-E-02]: 단일 임베딩 호출")
 
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        여러 텍스트를 한 번의 요청(input=list)으로 임베딩 → (B, D) float32 (정규화 전)
+        - 응답 data 는 item.index 기준으로 입력 순서에 다시 배치
+        - 예외는 상위 encode 에서 배치 단위로 재시도
+        """
+        return self.backend.embed(texts)
+
     def encode(self, texts: List[str]) -> np.ndarray:
         """
         배치 인코딩 + 재시도(backoff). 최종 shape = (N, D)
@@ -80,23 +162,169 @@ class Embeddings:
         # ----------------------------------------------------------------------------
         
         if not texts :
-            return np.zeros((0,1536), dtype='float32')
-
-        out = []
-        for start in range(0, len(texts), self.batch_size):
-            batch = texts[start:start+self.batch_size]
-            for each in batch:
-                for attempt in range(self.max_retries):
-                    try:
-                        out.append(self._embed_once(each))
-                        break
-                    except Exception as e:
-                        wait = 0.5 * (2 ** attempt)
-                        print(f"[WARN] embed retry {attempt+1}/{self.max_retries} after {wait:.1f}s: {e}")
-                        time.sleep(wait)
-                        if attempt == self.max_retries -1:
-                            raise
-        return np.vstack(out)
+            return np.zeros((0, self.backend.dim or 1536), dtype='float32')
+        if self.cache is None or not self.backend.remote:
+            return self._encode_api(texts)
+
+        # 캐시 조회 → 미스(중복 제거)만 API 인코딩 → 캐시에 저장
+        dims = self.dimensions or 0
+        hits = self.cache.get_many(self.model, dims, texts)
+        miss = list(dict.fromkeys(t for i, t in enumerate(texts) if i not in hits))
+        fresh: Dict[str, np.ndarray] = {}
+        if miss:
+            mvecs = self._encode_api(miss)
+            self.cache.put_many(self.model, dims, miss, mvecs)
+            fresh = dict(zip(miss, mvecs))
+        else:
+            self.last_stats = {"vectors": len(texts), "requests": 0, "tokens": 0}
+        self.last_stats.update({"cache_hits": len(hits), "cache_misses": len(texts) - len(hits)})
+        return np.vstack([hits[i] if i in hits else fresh[t] for i, t in enumerate(texts)]).astype("float32", copy=False)
+
+    def _encode_api(self, texts: List[str]) -> np.ndarray:
+        """캐시 없이 API 로 인코딩 (토큰 패킹 + 동시 요청 + 재시도) → (N, D) L2 정규화"""
+        # 토큰 예산으로 배치 패킹 → 배치당 1회 요청, 실패 시 해당 배치만 재전송
+        t0 = time.perf_counter()
+        plan = self._plan(texts)
+        batches = plan["batches"]
+        if self.concurrency > 1 and len(batches) > 1:
+            out, limit = self._encode_concurrent(batches)
+        else:
+            out, limit = [self._embed_with_retry(b) for b in batches], 1
+        return self._finish(texts, plan, out, t0, limit)
+
+    def _plan(self, texts: List[str]) -> Dict[str, Any]:
+        """입력 → 토큰 상한 처리된 조각 + 토큰 예산으로 패킹된 배치 목록"""
+        pieces, owner, weights = self._prepare(texts)
+        counts = [count_tokens(p) for p in pieces]
+        spans = pack_batches(counts, self.max_batch_tokens, min(self.batch_size, MAX_REQUEST_INPUTS))
+        return {"pieces": pieces, "owner": owner, "weights": weights, "tokens": sum(counts),
+                "batches": [pieces[a:b] for a, b in spans]}
+
+    def _finish(self, texts: List[str], plan: Dict[str, Any], out: List[np.ndarray], t0: float, limit: int) -> np.ndarray:
+        """배치별 결과 → (N, D) L2 정규화 + last_stats 기록"""
+        mat = np.vstack(out)
+        if len(plan["pieces"]) != len(texts):
+            # split 정책: 조각 벡터를 토큰 수로 가중 평균해 원래 입력 1개당 1벡터
+            agg = np.zeros((len(texts), mat.shape[1]), dtype="float32")
+            np.add.at(agg, np.asarray(plan["owner"]), mat * np.asarray(plan["weights"], dtype="float32")[:, None])
+            mat = agg
+        vecs = l2_normalize(mat)
+
+        elapsed = time.perf_counter() - t0
+        self.last_stats = {
+            "vectors": len(texts),
+            "requests": len(plan["batches"]),
+            "tokens": plan["tokens"],
+            "seconds": round(elapsed, 3),
+            "vectors_per_sec": round(len(texts) / elapsed, 1) if elapsed > 0 else None,
+            "concurrency": limit,
+        }
+        if len(plan["batches"]) > 1:
+            print(f"[INFO] embed: {len(texts)} vectors in {elapsed:.2f}s "
+                  f"({self.last_stats['vectors_per_sec']} vec/s, concurrency={limit})")
+        return vecs
+
+    # ---------- Async ----------
+    async def aencode(self, texts: List[str]) -> np.ndarray:
+        """
+        encode 의 asyncio 버전 (AsyncOpenAI). 결과는 encode 와 동일한 (N, D) L2 정규화 행렬
+        - 같은 이벤트 루프의 모든 호출이 클라이언트 1개 + 세마포어(ASYNC_MAX_INFLIGHT)를 공유
+          → 동시 질의가 많아도 스레드를 점유하지 않고 요청 수만 제한
+        - 캐시 조회/저장(SQLite)은 to_thread 로 처리
+        """
+        if not texts:
+            return np.zeros((0, self.backend.dim or 1536), dtype="float32")
+        if self.cache is None or not self.backend.remote:
+            return await self._aencode_api(texts)
+
+        dims = self.dimensions or 0
+        hits = await asyncio.to_thread(self.cache.get_many, self.model, dims, texts)
+        miss = list(dict.fromkeys(t for i, t in enumerate(texts) if i not in hits))
+        fresh: Dict[str, np.ndarray] = {}
+        if miss:
+            mvecs = await self._aencode_api(miss)
+            await asyncio.to_thread(self.cache.put_many, self.model, dims, miss, mvecs)
+            fresh = dict(zip(miss, mvecs))
+        else:
+            self.last_stats = {"vectors": len(texts), "requests": 0, "tokens": 0}
+        self.last_stats.update({"cache_hits": len(hits), "cache_misses": len(texts) - len(hits)})
+        return np.vstack([hits[i] if i in hits else fresh[t] for i, t in enumerate(texts)]).astype("float32", copy=False)
+
+    async def _aencode_api(self, texts: List[str]) -> np.ndarray:
+        t0 = time.perf_counter()
+        plan = self._plan(texts)
+        out = await asyncio.gather(*[self._aembed_with_retry(b) for b in plan["batches"]])
+        return self._finish(texts, plan, list(out), t0, min(ASYNC_MAX_INFLIGHT, len(plan["batches"])))
+
+    async def _aembed_with_retry(self, batch: List[str]) -> np.ndarray:
+        for attempt in range(self.max_retries):
+            try:
+                return await self.backend.aembed(batch)
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                wait = 0.5 * (2 ** attempt) * (1 + random.random())
+                print(f"[WARN] async embed retry {attempt+1}/{self.max_retries} after {wait:.1f}s"
+                      f"{' (throttled)' if _is_throttled(e) else ''}: {e}")
+                await asyncio.sleep(wait)
+
+    def _prepare(self, texts: List[str]) -> tuple:
+        """
+        입력별 토큰 상한 처리 → (요청할 조각들, 조각별 원래 입력 번호, 조각 가중치)
+        """
+        pieces: List[str] = []
+        owner: List[int] = []
+        weights: List[float] = []
+        for i, t in enumerate(texts):
+            if count_tokens(t) <= MAX_INPUT_TOKENS:
+                pieces.append(t); owner.append(i); weights.append(1.0)
+                continue
+            if self.oversize == "error":
+                raise ValueError(f"입력 {i} 이 토큰 상한({MAX_INPUT_TOKENS})을 넘습니다.")
+            parts = split_by_tokens(t, MAX_INPUT_TOKENS)
+            if self.oversize == "truncate":
+                print(f"[WARN] 입력 {i} 토큰 상한 초과 → 앞부분만 임베딩")
+                pieces.append(parts[0]); owner.append(i); weights.append(1.0)
+                continue
+            sizes = [count_tokens(p) for p in parts]
+            for p, n in zip(parts, sizes):
+                pieces.append(p); owner.append(i); weights.append(n / sum(sizes))
+        return pieces, owner, weights
+
+    def _embed_with_retry(self, batch: List[str], limiter: AdaptiveConcurrency | None = None) -> np.ndarray:
+        """배치 1개 요청 + backoff 재시도. limiter 가 있으면 시도마다 슬롯 확보/반납"""
+        for attempt in range(self.max_retries):
+            if limiter:
+                limiter.acquire()
+            try:
+                vecs = self._embed_batch(batch)
+            except Exception as e:
+                throttled = _is_throttled(e)
+                if limiter:
+                    limiter.release(throttled=throttled)
+                if attempt == self.max_retries - 1:
+                    raise
+                wait = 0.5 * (2 ** attempt)
+                if limiter:
+                    wait *= 1 + random.random()  # 동시 재시도가 한꺼번에 몰리지 않게 jitter
+                print(f"[WARN] embed retry {attempt+1}/{self.max_retries} after {wait:.1f}s"
+                      f"{' (throttled)' if throttled else ''}: {e}")
+                time.sleep(wait)
+                continue
+            if limiter:
+                limiter.release()
+            return vecs
+
+    def _encode_concurrent(self, batches: List[List[str]]) -> tuple:
+        """
+        배치를 스레드 풀로 동시에 요청. 결과는 배치 순서대로 반환 (출력 순서 결정적)
+        반환: (배치별 행렬 리스트, 종료 시점 동시성)
+        """
+        limiter = AdaptiveConcurrency(self.concurrency, self.max_concurrency)
+        with ThreadPoolExecutor(max_workers=limiter.maximum) as ex:
+            futures = [ex.submit(self._embed_with_retry, b, limiter) for b in batches]
+            out = [f.result() for f in futures]
+        return out, limiter.limit
 
 
         #raise NotImplementedError("TODO[DAY2-E-03]: 배치 임베딩 인코딩")
@@ -3,10 +3,15 @@
 인덱싱 입력 데이터 로딩/정제/청크
 """
 
-import re, json
-from typing import List, Dict, Any
+import os, re, json, bisect
+import multiprocessing as mp
+from typing import List, Dict, Any, Iterable, Iterator
 from pathlib import Path
 
+from student.day2.impl.manifest import file_sha256
+from student.day2.impl.text_cache import TextCache
+from student.day2.impl.tokens import count_tokens
+
 def read_text_file(path: str) -> str:
     """
     안전한 텍스트 로드(utf-8, errors='ignore')
@@ -32,15 +37,30 @@ def read_pdf_file(path: str) -> str:
     #  - return "\n".join(texts)
     # ----------------------------------------------------------------------------
     # 정답 구현:
+    return "\n".join(read_pdf_pages(path))
+
+
+def read_pdf_pages(path: str, start: int = 0, end: int | None = None) -> List[str]:
+    """
+    pypdf 로 [start, end) 페이지 텍스트를 페이지별 리스트로 추출 (0-based)
+    - 추출 실패 페이지는 "" 로 채워 페이지 번호가 밀리지 않게 함
+    """
     from pypdf import PdfReader  # type: ignore
     reader = PdfReader(path)
+    n = len(reader.pages)
+    end = n if end is None else min(end, n)
     texts: List[str] = []
-    for page in reader.pages:
+    for i in range(start, end):
         try:
-            texts.append(page.extract_text() or "")
+            texts.append(reader.pages[i].extract_text() or "")
         except Exception:
             texts.append("")
-    return "\n".join(texts)
+    return texts
+
+
+def pdf_page_count(path: str) -> int:
+    from pypdf import PdfReader  # type: ignore
+    return len(PdfReader(path).pages)
 
 
 def clean_text(s: str) -> str:
@@ -63,7 +83,10 @@ def clean_text(s: str) -> str:
     return s.strip()
 
 
-def chunk_text(text: str, chunk_size: int = 1200, chunk_overlap: int = 200) -> List[str]:
+CHUNK_SIZE, CHUNK_OVERLAP = 1200, 200
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> List[str]:
     """
     슬라이딩 윈도우로 청크 분할.
     - 길이가 chunk_size 이하이면 그대로 1청크
@@ -92,9 +115,293 @@ def chunk_text(text: str, chunk_size: int = 1200, chunk_overlap: int = 200) -> L
     return chunks
 
 
-def load_documents(paths_or_dir: List[str]) -> List[Dict[str, Any]]:
+CHUNK_TOKENS = 700            # structured 청커 목표 토큰 수
+FORCED_OVERLAP_CHARS = 100    # 경계 없이 강제로 자를 때만 쓰는 겹침
+
+_PARA = re.compile(r"\n\s*\n")
+# 문장 끝: 마침표류 뒤 공백 (각주 번호 "다.32)" 포함). PDF 줄바꿈은 문장 경계가 아님
+_SENT = re.compile(r"(?:(?<=[.!?。])|(?<=[.!?。]\d\))|(?<=[.!?。]\d\d\))|(?<=[.!?。]\d\d\d\)))\s+")
+
+
+def _segments(text: str, start: int, end: int, sep: re.Pattern) -> List[tuple]:
+    """text[start:end] 를 구분자 기준으로 자른 (s, e) 목록 (앞뒤 공백 제외, 빈 조각 제외)"""
+    out: List[tuple] = []
+    pos = start
+    for m in sep.finditer(text, start, end):
+        out.append((pos, m.start()))
+        pos = m.end()
+    out.append((pos, end))
+    trimmed = []
+    for s, e in out:
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        if s < e:
+            trimmed.append((s, e))
+    return trimmed
+
+
+def _hard_split(text: str, s: int, e: int, target_tokens: int, overlap: int) -> List[tuple]:
+    """경계가 없는 긴 문장: 목표 토큰에 맞는 글자 수 창으로 자르고 조각끼리만 overlap"""
+    n_tok = count_tokens(text[s:e])
+    width = max(overlap + 1, int((e - s) * target_tokens / max(n_tok, 1)))
+    out: List[tuple] = []
+    pos = s
+    while pos < e:
+        end = min(e, pos + width)
+        while end - pos > overlap + 1 and count_tokens(text[pos:end]) > target_tokens:
+            end = pos + int((end - pos) * 0.9)
+        out.append((pos, end))
+        if end >= e:
+            break
+        pos = end - overlap
+    return out
+
+
+def chunk_structured(text: str, target_tokens: int = CHUNK_TOKENS,
+                     forced_overlap: int = FORCED_OVERLAP_CHARS) -> List[tuple]:
+    """
+    구조 기반 청크 분할 → [(start, end), ...] (text 오프셋)
+    - 문단(빈 줄; 페이지 경계 포함) → 문장 → 강제 분할 순으로 단위를 만든 뒤
+      목표 토큰 수까지 순서대로 이어 붙임
+    - 문장 중간을 자르지 않음. 겹침은 강제 분할한 긴 문장에서만 발생
+    """
+    units: List[tuple] = []
+    for ps, pe in _segments(text, 0, len(text), _PARA):
+        if count_tokens(text[ps:pe]) <= target_tokens:
+            units.append((ps, pe))
+            continue
+        for ss, se in _segments(text, ps, pe, _SENT):
+            if count_tokens(text[ss:se]) <= target_tokens:
+                units.append((ss, se))
+            else:
+                units.extend(_hard_split(text, ss, se, target_tokens, forced_overlap))
+
+    bounds: List[tuple] = []
+    cur_s = cur_e = None
+    cur_tok = 0
+    for s, e in units:
+        n = count_tokens(text[s:e])
+        if cur_s is not None and cur_tok + n > target_tokens:
+            bounds.append((cur_s, cur_e))
+            cur_s = None
+        if cur_s is None:
+            cur_s, cur_tok = s, 0
+        cur_e = e
+        cur_tok += n
+    if cur_s is not None:
+        bounds.append((cur_s, cur_e))
+    return bounds
+
+
+def _fixed_bounds(text: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> List[tuple]:
+    """chunk_text 와 같은 슬라이딩 윈도우를 (start, end) 로 (text 는 이미 clean_text 된 상태)"""
+    if len(text) <= chunk_size:
+        return [(0, len(text))]
+    return [(s, min(len(text), s + chunk_size)) for s in range(0, len(text), chunk_size - chunk_overlap)]
+
+
+def collect_files(paths_or_dir: List[str]) -> List[str]:
+    """
+    입력 경로(디렉토리/파일)에서 txt/md/pdf 파일 경로 목록 수집
+    """
+    files: List[str] = []
+    for p in paths_or_dir:
+        pp = Path(p)
+        if pp.is_dir():
+            for ext in ("*.txt", "*.md", "*.pdf"):
+                files.extend([str(x) for x in pp.rglob(ext)])
+        else:
+            files.append(str(pp))
+    return files
+
+
+PAGE_SPLIT = 50  # 병렬 모드에서 이 페이지 수를 넘는 PDF는 페이지 구간으로 쪼개 추출
+# 파일 수가 workers 보다 적으면 PDF 하나를 workers/파일 수 개 구간으로 쪼갬 (구간당 최소 페이지 수)
+MIN_SPLIT_PAGES = 2
+
+
+def _extract_part(fp: str, start: int = 0, end: int | None = None) -> List[str] | None:
+    """
+    추출 작업 단위 (프로세스 풀 워커에서도 호출되므로 모듈 최상위 함수)
+    - pdf: [start, end) 페이지별 텍스트 리스트
+    - txt/md: [전체 텍스트]
+    - 지원하지 않는 확장자면 None
+    """
+    ext = fp.lower().split(".")[-1]
+    if ext in ("txt", "md"):
+        return [read_text_file(fp)]
+    if ext == "pdf":
+        return read_pdf_pages(fp, start, end)
+    return None
+
+
+def resolve_workers(workers: int | None) -> int:
+    """workers: None/0 → CPU 수, 1 → 직렬"""
+    if not workers or workers < 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def _plan_parts(fp: str, page_split: int, min_parts: int = 1) -> List[tuple]:
+    """
+    PDF를 페이지 구간 작업으로 분할, 나머지는 파일 통째로 1작업
+    - page_split 페이지를 넘으면 page_split 단위
+    - min_parts>1 (파일 수 < workers): 작은 PDF도 최소 min_parts 구간 (구간당 MIN_SPLIT_PAGES 페이지 이상)
+    """
+    if fp.lower().endswith(".pdf") and (page_split > 0 or min_parts > 1):
+        try:
+            n = pdf_page_count(fp)
+        except Exception:
+            return [(fp, 0, None)]
+        step = page_split if 0 < page_split < n else n
+        if min_parts > 1:
+            step = min(step, max(MIN_SPLIT_PAGES, -(-n // min_parts)))
+        if 0 < step < n:
+            return [(fp, s, min(n, s + step)) for s in range(0, n, step)]
+    return [(fp, 0, None)]
+
+
+def _iter_parallel(files: List[str], workers: int, timeout: float | None,
+                   page_split: int = PAGE_SPLIT) -> Iterator[tuple]:
+    """
+    프로세스 풀로 (파일, 페이지 구간) 단위 추출 후 파일별로 순서대로 다시 이어붙여 yield.
+    결과 순서 = files 순서 (청크 id 안정).
+    - 파일 수가 workers 보다 적으면 PDF를 workers/파일 수 개 구간으로 나눠 모든 코어 사용
+    - 앞서 제출하는 파일 수를 workers*2 로 제한 → 추출 결과가 메모리에 쌓이지 않음
+    - 작업당 timeout 초과/예외 → 경고. 파일 통째 작업이면 None(건너뜀),
+      페이지 구간 작업이면 해당 구간만 빈 페이지로 채움
+    - yield: (pages, ok) — ok=False 면 추출 실패(None) 또는 일부 구간이 빈 페이지로 채워진 불완전 결과
+    - 끝나면 terminate 로 멈춘 워커까지 정리
+    """
+    window = max(2, workers * 2)
+    min_parts = workers // len(files) if files else 1
+    pool = mp.Pool(processes=workers)
+    try:
+        queue: List[tuple] = []
+        nxt = 0
+        while nxt < len(files) or queue:
+            while nxt < len(files) and len(queue) < window:
+                fp = files[nxt]
+                parts = _plan_parts(fp, page_split, min_parts)
+                queue.append((fp, parts, [pool.apply_async(_extract_part, part) for part in parts]))
+                nxt += 1
+            fp, parts, results = queue.pop(0)
+            pages: List[str] | None = []
+            ok = True
+            for (_, start, end), res in zip(parts, results):
+                try:
+                    got = res.get(timeout=timeout)
+                except mp.TimeoutError:
+                    print(f"[WARN] 추출 시간 초과({timeout}s): {fp} [{start}:{end}]")
+                    got = None
+                except Exception as e:
+                    print(f"[WARN] 추출 실패: {fp} [{start}:{end}] ({e})")
+                    got = None
+                if got is None:
+                    ok = False
+                    if end is None:
+                        pages = None
+                        break
+                    got = [""] * (end - start)
+                pages.extend(got)
+            yield pages, ok
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def join_pages(pages: List[str]) -> tuple:
+    """
+    페이지별 원문 → (정제 텍스트, 페이지 스팬)
+    - 페이지마다 clean_text 후 빈 줄("\n\n")로 연결
+    - 스팬: [[텍스트 내 시작 오프셋, 페이지 번호(1-based)], ...] (빈 페이지 제외)
+    """
+    parts: List[str] = []
+    spans: List[List[int]] = []
+    pos = 0
+    for no, raw in enumerate(pages, start=1):
+        t = clean_text(raw)
+        if not t:
+            continue
+        if parts:
+            pos += 2
+        spans.append([pos, no])
+        parts.append(t)
+        pos += len(t)
+    return "\n\n".join(parts), spans
+
+
+def page_at(spans: List[List[int]], offset: int) -> int | None:
+    """텍스트 오프셋이 속한 페이지 번호 (스팬 없으면 None)"""
+    if not spans:
+        return None
+    i = bisect.bisect_right([s[0] for s in spans], offset) - 1
+    return spans[max(i, 0)][1]
+
+
+def iter_documents(paths_or_dir: List[str], workers: int | None = 1, timeout: float | None = 300.0,
+                   cache: TextCache | None = None, failed: List[str] | None = None) -> Iterator[Dict[str, Any]]:
+    """
+    load_documents 의 스트리밍 버전: 문서를 하나씩 {"path":..., "text":...(, "pages":...)} 로 yield
+    - workers=1: 직렬 추출 (기본)
+    - workers>1 또는 0/None(=CPU 수): 프로세스 풀 병렬 추출, 순서는 입력 순서 유지
+    - timeout: 병렬 모드에서 작업(파일 또는 페이지 구간)당 최대 대기(초)
+    - pdf 문서는 "pages": [[오프셋, 페이지 번호], ...] 포함
+    - cache: TextCache 주면 pdf 는 sha256 으로 조회 → 히트면 pypdf 생략, 미스면 추출 후 저장
+      (페이지 구간 일부가 실패한 불완전 결과는 저장하지 않음 → 다음 빌드에서 재추출)
+    - failed: 리스트를 주면 병렬 추출이 실패(건너뜀)하거나 일부 구간만 추출된 파일 경로를 추가
+      (빌드 측이 매니페스트에 불완전으로 표시 → 증분 빌드에서 다시 처리)
+    """
+    files = collect_files(paths_or_dir)
+
+    cached: Dict[int, List[str]] = {}
+    shas: Dict[int, str] = {}
+    if cache is not None:
+        for i, fp in enumerate(files):
+            if fp.lower().endswith(".pdf"):
+                shas[i] = file_sha256(fp)
+                hit = cache.get(shas[i])
+                if hit is not None:
+                    cached[i] = hit
+        if shas:
+            print(f"[INFO] text cache: hit={len(cached)}, miss={len(shas) - len(cached)}")
+    todo = [i for i in range(len(files)) if i not in cached]
+
+    workers = resolve_workers(workers)
+    if workers > 1 and len(todo) > 0:
+        extracted = _iter_parallel([files[i] for i in todo], workers, timeout)
+    else:
+        extracted = ((_extract_part(files[i]), True) for i in todo)
+    extracted = iter(extracted)
+
+    for i, fp in enumerate(files):
+        if i in cached:
+            raw = cached.pop(i)
+        else:
+            raw, ok = next(extracted)
+            if not ok and failed is not None:
+                failed.append(fp)
+            if cache is not None and raw is not None and i in shas:
+                if ok:
+                    cache.put(shas[i], raw)
+                else:
+                    print(f"[WARN] 일부 페이지 구간 추출 실패 → 텍스트 캐시에 저장하지 않음: {fp}")
+        if raw is None:
+            continue
+        if fp.lower().endswith(".pdf"):
+            txt, spans = join_pages(raw)
+            yield {"path": fp, "text": txt, "pages": spans}
+        else:
+            yield {"path": fp, "text": clean_text(raw[0])}
+
+
+def load_documents(paths_or_dir: List[str], workers: int | None = 1, timeout: float | None = 300.0,
+                   cache: TextCache | None = None) -> List[Dict[str, Any]]:
     """
     입력 경로(디렉토리/파일)에서 txt/md/pdf 수집 → [{"path":..., "text":...}, ...]
+    - 옵션은 iter_documents 참고 (workers/timeout/cache)
     """
     # ----------------------------------------------------------------------------
     # TODO[DAY2-G-05] 구현 지침
@@ -113,34 +420,44 @@ def load_documents(paths_or_dir: List[str]) -> List[Dict[str, Any]]:
     #       txt = clean_text(raw); docs.append({"path":fp,"text":txt})
     #  - return docs
     # ----------------------------------------------------------------------------
-    # 정답 구현:
-    files: List[str] = []
-    for p in paths_or_dir:
-        pp = Path(p)
-        if pp.is_dir():
-            for ext in ("*.txt", "*.md", "*.pdf"):
-                files.extend([str(x) for x in pp.rglob(ext)])
-        else:
-            files.append(str(pp))
+    # 정답 구현: (스트리밍 버전을 리스트로 모음)
+    return list(iter_documents(paths_or_dir, workers=workers, timeout=timeout, cache=cache))
+
 
-    docs: List[Dict[str, Any]] = []
-    for fp in files:
-        ext = fp.lower().split(".")[-1]
-        if ext in ("txt", "md"):
-            raw = read_text_file(fp)
-        elif ext == "pdf":
-            raw = read_pdf_file(fp)
+def iter_corpus(paths_or_dir: List[str], workers: int | None = 1, timeout: float | None = 300.0,
+                cache: TextCache | None = None, chunker: str = "fixed",
+                chunk_tokens: int = CHUNK_TOKENS, failed: List[str] | None = None) -> Iterator[Dict[str, Any]]:
+    """
+    build_corpus 의 스트리밍 버전: 청크를 하나씩 yield (문서 1개 분량만 메모리에 유지)
+    - chunker: "fixed"(chunk_text 슬라이딩 윈도우) | "structured"(chunk_structured, 목표 chunk_tokens)
+    - pdf 청크 meta 에는 page/page_end (1-based) 추가
+    - failed: iter_documents 참고
+    """
+    if chunker not in ("fixed", "structured"):
+        raise ValueError(f"chunker 는 fixed/structured 중 하나: {chunker}")
+    for d in iter_documents(paths_or_dir, workers=workers, timeout=timeout, cache=cache, failed=failed):
+        text = d["text"]
+        if chunker == "structured":
+            bounds = chunk_structured(text, target_tokens=chunk_tokens)
         else:
-            continue
-        txt = clean_text(raw)
-        docs.append({"path": fp, "text": txt})
-    return docs
+            bounds = _fixed_bounds(text)
+        spans = d.get("pages")
+        for i, (start, end) in enumerate(bounds):
+            cid = f"{d['path']}::chunk_{i:04d}"
+            meta = {"path": d["path"], "chunk": i}
+            if spans:
+                meta["page"] = page_at(spans, start)
+                meta["page_end"] = page_at(spans, max(start, end - 1))
+            yield {"id": cid, "text": text[start:end], "meta": meta}
 
 
-def build_corpus(paths_or_dir: List[str]) -> List[Dict[str, Any]]:
+def build_corpus(paths_or_dir: List[str], workers: int | None = 1, timeout: float | None = 300.0,
+                 cache: TextCache | None = None, chunker: str = "fixed",
+                 chunk_tokens: int = CHUNK_TOKENS) -> List[Dict[str, Any]]:
     """
     문서를 청크 단위로 나눠 코퍼스 생성
     반환 예: [{"id":"<path>::chunk_0000","text":"...", "meta":{"path":..., "chunk":0}}, ...]
+    - 옵션은 iter_documents 참고 / 메모리가 걱정되면 iter_corpus 사용
     """
     # ----------------------------------------------------------------------------
     # TODO[DAY2-G-06] 구현 지침
@@ -153,15 +470,21 @@ def build_corpus(paths_or_dir: List[str]) -> List[Dict[str, Any]]:
     #           corpus.append({"id":cid,"text":ch,"meta":{"path":d["path"],"chunk":i}})
     #  - return corpus
     # ----------------------------------------------------------------------------
-    # 정답 구현:
-    docs = load_documents(paths_or_dir)
-    corpus: List[Dict[str, Any]] = []
-    for d in docs:
-        chunks = chunk_text(d["text"])
-        for i, ch in enumerate(chunks):
-            cid = f"{d['path']}::chunk_{i:04d}"
-            corpus.append({"id": cid, "text": ch, "meta": {"path": d["path"], "chunk": i}})
-    return corpus
+    # 정답 구현: (스트리밍 버전을 리스트로 모음)
+    return list(iter_corpus(paths_or_dir, workers=workers, timeout=timeout, cache=cache,
+                            chunker=chunker, chunk_tokens=chunk_tokens))
+
+
+def batched(items: Iterable[Any], n: int) -> Iterator[List[Any]]:
+    """이터러블을 n개씩 리스트로 묶어 yield (마지막 배치는 n개 미만 가능)"""
+    buf: List[Any] = []
+    for it in items:
+        buf.append(it)
+        if len(buf) >= n:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
 
 
 def save_docs_jsonl(items: List[Dict[str, Any]], out_path: str):
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+인덱스 매니페스트 (증분 빌드용)
+- 인덱스 디렉토리 옆에 manifest.json 저장
+- 파일별: path, size, mtime, sha256, 청크 수(chunks)
+- size/mtime 이 같으면 해시 생략, 다르면 sha256 로 실제 변경 여부 확인
+- incomplete: 추출이 실패/일부만 된 파일 표시 → 내용이 같아도 다음 증분 빌드에서 변경으로 취급
+"""
+
+import os, json, hashlib, time
+from typing import Dict, Any, List, Tuple
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: str, bufsize: int = 1 << 20) -> str:
+    """파일 내용 sha256 (1MB 단위 스트리밍)"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(bufsize)
+            if not buf:
+                break
+            h.update(buf)
+    return h.hexdigest()
+
+
+def file_entry(path: str, sha256: str | None = None) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {
+        "path": path,
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "sha256": sha256 or file_sha256(path),
+    }
+
+
+def manifest_path(index_dir: str) -> str:
+    return os.path.join(index_dir, MANIFEST_NAME)
+
+
+def load_manifest(index_dir: str) -> Dict[str, Any]:
+    """없거나 깨졌으면 빈 매니페스트 반환"""
+    p = manifest_path(index_dir)
+    if not os.path.exists(p):
+        return {"version": MANIFEST_VERSION, "model": None, "files": {}}
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            m = json.load(f)
+    except Exception as e:
+        print(f"[WARN] manifest 파싱 실패, 무시합니다: {e}")
+        return {"version": MANIFEST_VERSION, "model": None, "files": {}}
+    m.setdefault("files", {})
+    return m
+
+
+def save_manifest(manifest: Dict[str, Any], index_dir: str):
+    """임시 파일에 쓰고 os.replace 로 교체 (중간에 죽어도 이전 매니페스트 유지)"""
+    os.makedirs(index_dir, exist_ok=True)
+    manifest["version"] = MANIFEST_VERSION
+    manifest["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    p = manifest_path(index_dir)
+    tmp = p + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, p)
+
+
+def diff_files(old_files: Dict[str, Dict[str, Any]], files: List[str]) -> Tuple[List[str], List[str], Dict[str, Dict[str, Any]]]:
+    """
+    현재 파일 목록과 이전 매니페스트 비교
+    반환: (새로 추가/변경된 파일, 삭제·변경되어 기존 청크를 지워야 할 파일, 최신 엔트리 dict)
+    - 최신 엔트리에는 청크 수가 아직 없음 (빌드 후 채움)
+    - 이전 엔트리가 incomplete 면 size/mtime/sha256 이 같아도 변경으로 취급 (기존 청크 삭제 후 재처리)
+    """
+    changed: List[str] = []
+    stale: List[str] = []
+    entries: Dict[str, Dict[str, Any]] = {}
+    for fp in files:
+        st = os.stat(fp)
+        old = old_files.get(fp)
+        if old and old.get("incomplete"):
+            entries[fp] = file_entry(fp)
+            changed.append(fp)
+            stale.append(fp)
+            continue
+        if old and old.get("size") == st.st_size and old.get("mtime") == st.st_mtime:
+            entries[fp] = dict(old)
+            continue
+        entry = file_entry(fp)
+        if old and old.get("sha256") == entry["sha256"]:
+            # 내용은 그대로(touch 등) → 메타만 갱신
+            entry["chunks"] = old.get("chunks")
+            entries[fp] = entry
+            continue
+        entries[fp] = entry
+        changed.append(fp)
+        if old:
+            stale.append(fp)
+    for fp in old_files:
+        if fp not in entries:
+            stale.append(fp)
+    return changed, stale, entries
@@ -1,30 +1,65 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-import os, json
+import os, asyncio, threading, sqlite3
 from typing import Dict, Any, List
 import numpy as np
 
 from student.common.schemas import Day2Plan
-from .embeddings import Embeddings
+from .embeddings import Embeddings, default_embed_cache_path
+from .embed_cache import EmbeddingCache
 from .store import FaissStore
+from .backends import model_dim
+from .registry import STORES, index_files
+
+# (model, dimensions, cache 경로) → Embeddings: 질의마다 클라이언트/SQLite 연결을 새로 만들지 않음
+_EMBEDDINGS: Dict[tuple, Embeddings] = {}
+_EMBEDDINGS_LOCK = threading.Lock()
+# 질의 임베딩 캐시: DAY2_QUERY_CACHE=0 이면 끔. 히트의 last_used 는 이 간격(초)마다 모아서 기록
+QUERY_CACHE = os.getenv("DAY2_QUERY_CACHE", "1") != "0"
+QUERY_CACHE_TOUCH = float(os.getenv("DAY2_QUERY_CACHE_TOUCH", "60"))
 
 def _idx_paths(index_dir: str):
-    return (
-        os.path.join(index_dir, "faiss.index"),
-        os.path.join(index_dir, "docs.jsonl"),
-    )
+    """CURRENT 가 가리키는 버전의 (faiss.index, 문서 파일) — 빌드 중에도 이전 버전을 그대로 읽음"""
+    return index_files(index_dir)
+
+def _check_compat(store: FaissStore, plan: Day2Plan):
+    """
+    인덱스-질의 임베더 호환성 확인 (API 호출 없음)
+    - index_meta.json 있으면: 빌드 모델 == plan.embedding_model
+    - 없으면(예전 인덱스): 모델 기본 차원표(backends.MODEL_DIMS)로 차원만 비교, 모르는 모델이면 생략
+    """
+    built = store.meta.get("model")
+    if built is not None:
+        if built != plan.embedding_model:
+            raise ValueError(f"인덱스 빌드 모델과 질의 모델이 다릅니다. (index={built}, plan={plan.embedding_model})")
+        return
+    expected = model_dim(plan.embedding_model)
+    if expected is not None and store.dim != expected:
+        raise ValueError(f"임베딩 차원이 인덱스와 다릅니다. (index={store.dim}, embedder={expected})")
+
+def _load_store(plan: Day2Plan) -> FaissStore:
+    """프로세스 전역 레지스트리에서 스토어 조회 (최초 1회만 디스크 로드, 새 버전은 백그라운드 재로드)"""
+    store = STORES.get(plan.index_dir)
+    _check_compat(store, plan)
+    return store
 
-def _load_store(plan: Day2Plan, emb: Embeddings) -> FaissStore:
-    index_path, docs_path = _idx_paths(plan.index_dir)
-    if not (os.path.exists(index_path) and os.path.exists(docs_path)):
-        raise FileNotFoundError(f"FAISS 인덱스가 없습니다. 먼저 ingest를 실행하세요: {plan.index_dir}")
-    store = FaissStore.load(index_path, docs_path)
-    # 차원 체크
-    test_dim = emb.encode(["__dim_check__"]).shape[1]
-    if store.dim != test_dim:
-        raise ValueError(f"임베딩 차원이 인덱스와 다릅니다. (index={store.dim}, embedder={test_dim})")
+async def _aload_store(plan: Day2Plan) -> FaissStore:
+    """_load_store 의 async 버전: 레지스트리 조회(첫 로드는 디스크 I/O)는 to_thread"""
+    store = await asyncio.to_thread(STORES.get, plan.index_dir)
+    _check_compat(store, plan)
     return store
 
+def _query_cache(index_dir: str) -> EmbeddingCache | None:
+    """질의 임베딩 캐시 열기. 끄거나 열 수 없으면(읽기 전용 마운트 등) None → 캐시 없이 임베딩"""
+    if not QUERY_CACHE:
+        return None
+    path = default_embed_cache_path(index_dir)
+    try:
+        return EmbeddingCache(path, touch_interval=QUERY_CACHE_TOUCH)
+    except (OSError, sqlite3.Error) as e:
+        print(f"[WARN] 질의 임베딩 캐시를 열 수 없어 캐시 없이 진행합니다: {path} ({e})")
+        return None
+
 def _gate(contexts: List[Dict[str, Any]], plan: Day2Plan) -> Dict[str, Any]:
     if not contexts:
         return {"status":"insufficient","top_score":0.0,"mean_topk":0.0}
@@ -50,14 +85,56 @@ class Day2Agent:
     def __init__(self, plan_defaults: Day2Plan = Day2Plan()):
         self.plan_defaults = plan_defaults
 
+    def _embeddings(self, plan: Day2Plan, store: FaissStore) -> Embeddings:
+        # 인덱스를 API dimensions 로 만들었으면 질의도 같은 차원으로 (PCA 는 인덱스가 질의에 직접 적용)
+        dimensions = store.meta.get("dimensions")
+        cache_path = default_embed_cache_path(plan.index_dir)
+        key = (plan.embedding_model, dimensions, cache_path)
+        emb = _EMBEDDINGS.get(key)
+        if emb is None:
+            with _EMBEDDINGS_LOCK:
+                emb = _EMBEDDINGS.get(key)
+                if emb is None:
+                    emb = Embeddings(model=plan.embedding_model, dimensions=dimensions,
+                                     cache=_query_cache(plan.index_dir))
+                    _EMBEDDINGS[key] = emb
+        return emb
+
     def handle(self, query: str, plan: Day2Plan = None) -> Dict[str, Any]:
         plan = plan or self.plan_defaults
-        emb = Embeddings(model=plan.embedding_model)
-
-        store = _load_store(plan, emb)
+        store = _load_store(plan)
+        emb = self._embeddings(plan, store)
         qv = emb.encode([query])[0]
         contexts = store.search(qv, top_k=plan.top_k)
+        return self._payload(query, plan, contexts)
+
+    def handle_many(self, queries: List[str], plan: Day2Plan = None) -> List[Dict[str, Any]]:
+        """
+        여러 질의를 한 번에: 임베딩 encode 1회(배치) → search_batch 1회 → 질의별 게이팅/페이로드
+        결과 순서 = queries 순서, 각 항목은 handle(query, plan) 과 같은 형식 (야간 리포트 등 대량 질의용)
+        """
+        plan = plan or self.plan_defaults
+        if not queries:
+            return []
+        store = _load_store(plan)
+        emb = self._embeddings(plan, store)
+        qvs = emb.encode(list(queries))
+        results = store.search_batch(qvs, top_k=plan.top_k)
+        return [self._payload(q, plan, contexts) for q, contexts in zip(queries, results)]
+
+    async def ahandle(self, query: str, plan: Day2Plan = None) -> Dict[str, Any]:
+        """
+        handle 의 asyncio 버전: 임베딩은 aencode(공유 AsyncOpenAI + 세마포어),
+        인덱스 로드/검색은 to_thread → 여러 질의가 이벤트 루프 하나를 공유
+        """
+        plan = plan or self.plan_defaults
+        store = await _aload_store(plan)
+        emb = self._embeddings(plan, store)
+        qv = (await emb.aencode([query]))[0]
+        contexts = await asyncio.to_thread(store.search, qv, plan.top_k)
+        return self._payload(query, plan, contexts)
 
+    def _payload(self, query: str, plan: Day2Plan, contexts: List[Dict[str, Any]]) -> Dict[str, Any]:
         gate = _gate(contexts, plan)
         payload: Dict[str, Any] = {
             "type": "rag_answer",
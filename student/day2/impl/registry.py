@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+프로세스 전역 FaissStore 레지스트리 (index_dir 별 1회 로드, 스레드 간 공유)
+- get(index_dir): 로드된 스토어 반환. 첫 호출만 동기 로드
+- 디스크 버전 확인은 check_interval 초에 한 번 (CURRENT 버전 + 파일 mtime/size stat, 수 μs)
+- 바뀌었으면 백그라운드 스레드에서 새 버전 로드 → 완료 후 교체. 그동안은 이전 스토어로 계속 응답
+- 새 버전 로드 실패 시 경고만 남기고 이전 스토어 유지 (다음 확인 때 재시도)
+- mmap=True(기본): 읽기 전용 mmap 로드 → 같은 버전을 여는 워커 프로세스들이 벡터 페이지를 공유
+  (DAY2_FAISS_MMAP=0 이면 예전처럼 프로세스마다 전체 복사)
+"""
+
+import os, time, threading
+from typing import Dict, Tuple
+
+from student.day2.impl.store import FaissStore
+from student.day2.impl.versions import resolve_index_dir
+from student.day2.impl.docstore import docs_file
+
+Signature = Tuple[str, int, int, int, int]
+
+
+def index_files(index_dir: str) -> Tuple[str, str]:
+    """CURRENT 가 가리키는 버전의 (faiss.index, docs.bin — 예전 인덱스면 docs.jsonl)"""
+    d = resolve_index_dir(index_dir)
+    return os.path.join(d, "faiss.index"), docs_file(d)
+
+
+def signature(index_dir: str) -> Signature:
+    """디스크 버전 식별자: (인덱스 경로, mtime_ns/size x 2). 버전 디렉토리가 바뀌면 경로가 바뀜"""
+    index_path, docs_path = index_files(index_dir)
+    si, sd = os.stat(index_path), os.stat(docs_path)
+    return (index_path, si.st_mtime_ns, si.st_size, sd.st_mtime_ns, sd.st_size)
+
+
+class _Entry:
+    __slots__ = ("store", "sig", "checked", "reloading")
+
+    def __init__(self, store: FaissStore, sig: Signature):
+        self.store = store
+        self.sig = sig
+        self.checked = time.monotonic()
+        self.reloading = False
+
+
+class StoreRegistry:
+    def __init__(self, check_interval: float = 1.0, mmap: bool = True):
+        self.check_interval = check_interval
+        self.mmap = mmap
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _load(self, index_dir: str) -> _Entry:
+        index_path, docs_path = index_files(index_dir)
+        if not (os.path.exists(index_path) and os.path.exists(docs_path)):
+            raise FileNotFoundError(f"FAISS 인덱스가 없습니다. 먼저 ingest를 실행하세요: {index_dir}")
+        sig = signature(index_dir)
+        store = FaissStore.load(index_path, docs_path, mmap=self.mmap)
+        self.loads += 1
+        return _Entry(store, sig)
+
+    def _reload(self, key: str, index_dir: str, entry: _Entry):
+        try:
+            fresh = self._load(index_dir)
+            with self._lock:
+                self._entries[key] = fresh
+            print(f"[INFO] store reloaded: {fresh.sig[0]} (n={len(fresh.store)})")
+        except Exception as e:
+            print(f"[WARN] store reload 실패, 이전 버전 유지: {e}")
+        finally:
+            entry.reloading = False
+
+    def get(self, index_dir: str) -> FaissStore:
+        key = os.path.abspath(index_dir)
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:  # 동시에 첫 요청이 여러 개 와도 로드는 1번
+                    entry = self._load(index_dir)
+                    self._entries[key] = entry
+            return entry.store
+
+        now = time.monotonic()
+        if now - entry.checked >= self.check_interval and not entry.reloading:
+            entry.checked = now
+            try:
+                changed = signature(index_dir) != entry.sig
+            except OSError:
+                changed = False  # 교체 중이거나 지워졌으면 이전 스토어로 계속 응답
+            if changed:
+                with self._lock:
+                    if entry.reloading or self._entries.get(key) is not entry:
+                        return self._entries[key].store
+                    entry.reloading = True
+                threading.Thread(target=self._reload, args=(key, index_dir, entry),
+                                 name="faiss-store-reload", daemon=True).start()
+        return entry.store
+
+    def invalidate(self, index_dir: str | None = None):
+        """강제 재로드용 (None 이면 전체)"""
+        with self._lock:
+            if index_dir is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(index_dir), None)
+
+
+STORES = StoreRegistry(float(os.getenv("DAY2_STORE_CHECK_INTERVAL", "1.0")),
+                       mmap=os.getenv("DAY2_FAISS_MMAP", "1") != "0")
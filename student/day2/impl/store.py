@@ -1,57 +1,495 @@
 # -*- coding: utf-8 -*-
-import os, json
-from typing import List, Dict, Any, Tuple
+import os, json, math, time, hashlib
+from typing import List, Dict, Any, Tuple, Iterable
 import numpy as np
 import faiss
 
+from student.day2.impl.docstore import DocStore, DocTable, write_doc_table
+
+COMPACT_RATIO = 0.2  # 톰스톤이 ntotal 의 이 비율을 넘으면 remove 시 자동 compact
+META_NAME = "index_meta.json"  # faiss.index 옆 메타데이터 (모델/차원/정규화/청크 설정/빌드 시각)
+# 읽기 전용 mmap 로드 플래그. IO_FLAG_MMAP_IFC 는 Flat/SQ/PQ 코드 배열·IVF 역리스트·HNSW 벡터를 파일에서 바로 참조
+# (없는 예전 faiss 는 IO_FLAG_MMAP → IVF 역리스트만 mmap, 나머지는 복사)
+MMAP_FLAG = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+# ANN 인덱스 종류 (모두 stable id 사용, 내적 = 코사인)
+#  flat : 정확 검색, 학습 없음. 질의당 O(N·D)
+#  ivf  : IVF-Flat. nlist 개 군집 중 nprobe 개만 탐색 (원본 벡터 보관 → 메모리는 Flat 과 같음)
+#  ivfpq: IVF-PQ. 벡터를 pq_m 바이트 코드로 압축 (수백만 청크 이상, 근사 점수)
+#  ivf/ivfpq 는 IDMap2 없이 역리스트에 stable id 를 직접 저장 (+ Hashtable direct map 으로 id 단위 삭제).
+#  IDMap2 의 remove_ids 는 내부 인덱스가 Flat 처럼 위치를 당긴다고 가정하는데 IVF 는 내부 번호를 그대로
+#  두므로, IDMap2(IVF) 에서 삭제하면 id 변환이 깨짐
+#  hnsw : 그래프 탐색 (학습 없음, recall/지연 우수, 벡터당 그래프 메모리 추가).
+#         faiss HNSW 는 삭제가 안 되므로 compact 는 남은 벡터로 그래프 재구성
+INDEX_TYPES = ("flat", "ivf", "ivfpq", "hnsw")
+AUTO_FLAT_MAX = 50_000     # auto: 이 청크 수 이하는 flat
+AUTO_IVF_MAX = 2_000_000   # auto: 이하는 ivf, 초과는 ivfpq (hnsw 는 명시적으로만 — 삭제 시 재구성 비용)
+HNSW_M = 32
+EF_SEARCH = 64
+TRAIN_PER_LIST = 39        # faiss k-means 권장 최소 학습 벡터 수 / 군집
+
+# 스칼라 양자화 (ann["sq"]): flat / ivf / hnsw 의 벡터 저장 형식. float32 대비 fp16 은 1/2, sq8 은 1/4
+#  rescore: 양자화 점수로 top_k * rescore 개 후보를 뽑은 뒤 docs.vecs(float32 원본, mmap)로 다시 채점해 정렬
+#           원본 벡터는 디스크에만 두고 후보 행만 읽음 → RAM 은 양자화 크기 유지
+SQ_TYPES = {"fp16": "SQfp16", "sq8": "SQ8"}
+_QTYPE_NAMES = {faiss.ScalarQuantizer.QT_fp16: "fp16", faiss.ScalarQuantizer.QT_8bit: "sq8"}
+
+
+def _pq_m(dim: int) -> int:
+    """PQ 서브벡터 수: dim 의 약수 중 dim/8 이하 최댓값 (1536 → 192바이트/벡터)"""
+    return max(m for m in range(1, max(dim // 8, 1) + 1) if dim % m == 0)
+
+
+def resolve_ann(ann: Dict[str, Any] | None, n: int, dim: int, n_train: int | None = None) -> Dict[str, Any]:
+    """
+    빌드 요청 {"type": auto|flat|ivf|ivfpq|hnsw, "nlist", "nprobe", "pq_m", "hnsw_m", "ef_search",
+              "sq": fp16|sq8, "rescore"} (없는 키는 기본값)
+    + 예상 청크 수 n, 저장 차원 dim → 확정 설정 (index_meta.json 의 "ann")
+    - nlist 기본 4·√n, 학습 벡터가 n_train 개면 n_train/39 이하로 제한. nprobe 기본 nlist/16 (최소 8)
+    """
+    ann = {k: v for k, v in (ann or {}).items() if v is not None}
+    kind = ann.get("type", "flat")
+    if kind == "auto":
+        kind = "flat" if n <= AUTO_FLAT_MAX else "ivf" if n <= AUTO_IVF_MAX else "ivfpq"
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"지원하지 않는 인덱스 종류입니다: {kind} (가능: auto, {', '.join(INDEX_TYPES)})")
+    out: Dict[str, Any] = {"type": kind}
+    if kind in ("ivf", "ivfpq"):
+        nlist = ann.get("nlist")
+        if not nlist:
+            nlist = int(4 * math.sqrt(max(n, 1)))
+            if n_train:
+                nlist = min(nlist, n_train // TRAIN_PER_LIST)
+        out["nlist"] = max(int(nlist), 1)
+        out["nprobe"] = min(int(ann.get("nprobe") or max(out["nlist"] // 16, 8)), out["nlist"])
+        if kind == "ivfpq":
+            out["pq_m"] = int(ann.get("pq_m") or _pq_m(dim))
+    elif kind == "hnsw":
+        out["hnsw_m"] = int(ann.get("hnsw_m") or HNSW_M)
+        out["ef_search"] = int(ann.get("ef_search") or EF_SEARCH)
+    if ann.get("sq"):
+        if ann["sq"] not in SQ_TYPES:
+            raise ValueError(f"지원하지 않는 양자화입니다: {ann['sq']} (가능: {', '.join(SQ_TYPES)})")
+        if kind == "ivfpq":
+            raise ValueError("ivfpq 는 이미 PQ 코드로 압축되므로 sq 와 함께 쓸 수 없습니다.")
+        out["sq"] = ann["sq"]
+    if ann.get("rescore"):
+        out["rescore"] = int(ann["rescore"])
+    return out
+
+
+def index_spec(ann: Dict[str, Any]) -> str:
+    """확정 설정 → faiss.index_factory 문자열 (IDMap2 아래 부분, ivf/ivfpq 는 IDMap2 없이 그대로)"""
+    kind, codec = ann["type"], SQ_TYPES.get(ann.get("sq"))
+    if kind == "ivf":
+        return f"IVF{ann['nlist']},{codec or 'Flat'}"
+    if kind == "ivfpq":
+        return f"IVF{ann['nlist']},PQ{ann['pq_m']}"
+    if kind == "hnsw":
+        return f"HNSW{ann['hnsw_m']}" + (f",{codec}" if codec else "")
+    return codec or "Flat"
+
+
+def _detect_ann(index) -> Dict[str, Any]:
+    """로드한 인덱스 구조 → 설정 (index_meta.json 이 없는 예전 인덱스용)"""
+    if isinstance(index, faiss.IndexPreTransform):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexIDMap2):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return {"type": "ivfpq", "nlist": index.nlist, "nprobe": index.nprobe, "pq_m": index.pq.M}
+    if isinstance(index, faiss.IndexIVF):
+        out = {"type": "ivf", "nlist": index.nlist, "nprobe": index.nprobe}
+        sq = index.sq if isinstance(index, faiss.IndexIVFScalarQuantizer) else None
+    elif isinstance(index, faiss.IndexHNSW):
+        out = {"type": "hnsw", "hnsw_m": index.hnsw.nb_neighbors(1), "ef_search": index.hnsw.efSearch}
+        storage = faiss.downcast_index(index.storage)
+        sq = storage.sq if isinstance(storage, faiss.IndexScalarQuantizer) else None
+    else:
+        out = {"type": "flat"}
+        sq = index.sq if isinstance(index, faiss.IndexScalarQuantizer) else None
+    if sq is not None and sq.qtype in _QTYPE_NAMES:
+        out["sq"] = _QTYPE_NAMES[sq.qtype]
+    return out
+
+
+def rescore(query: np.ndarray, ids: np.ndarray, vecs: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """후보(ids, float32 원본 vecs)를 질의와의 정확한 내적으로 다시 정렬 → (점수, id) 상위 top_k"""
+    scores = vecs @ query
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return scores[order], ids[order]
+
+
+def quant_report(sample: np.ndarray, ann: Dict[str, Any], pca_dim: int | None = None, k: int = 10,
+                 n_queries: int = 200, seed: int = 0) -> Dict[str, Any]:
+    """
+    빌드 시 학습 표본으로 양자화 설정 평가 (표본 안에서의 추정치)
+    - recall@k: 표본 전체 정확 검색(원본 float32 내적) 대비. 같은 설정의 float32 인덱스 / 양자화 / 양자화+재채점
+    - bytes_per_vec: 벡터 1개가 늘리는 인덱스 크기 (id 맵·그래프 포함, 군집 중심·PCA 행렬 같은 고정분 제외)
+    """
+    n, dim = sample.shape
+    ids = np.arange(n, dtype="int64")
+    rng = np.random.default_rng(seed)
+    q_idx = rng.choice(n, size=min(n_queries, n), replace=False)
+    k = min(k, n - 1)
+    Q = sample[q_idx]
+
+    def drop_self(I):
+        return [row[(row != qi) & (row != -1)] for row, qi in zip(I, q_idx)]
+
+    def recall(pred):
+        return round(float(np.mean([len(set(p[:k]) & set(t)) / k for p, t in zip(pred, truth)])), 4)
+
+    truth = [t[:k] for t in drop_self(np.argsort(-(Q @ sample.T), axis=1)[:, :k + 1])]
+    out: Dict[str, Any] = {"sample": n, "k": k, "ann": dict(ann)}
+    base_ann = {key: v for key, v in ann.items() if key not in ("sq", "rescore")}
+    for name, a in (("float32", base_ann), ("quant", ann)):
+        st = FaissStore(dim, "", "", pca_dim=pca_dim, ann=a)
+        st.train(sample)
+        empty = faiss.serialize_index(st.index).nbytes
+        st.index.add_with_ids(sample, ids)
+        out[f"bytes_per_vec_{name}"] = round((faiss.serialize_index(st.index).nbytes - empty) / n, 1)
+        kk = k * ann["rescore"] if name == "quant" and ann.get("rescore") else k
+        _, I = st.index.search(Q, kk + 1)
+        out[f"recall_{name}"] = recall(drop_self(I))
+        if kk != k:
+            out["recall_rescored"] = recall([rescore(sample[qi], c, sample[c], k)[1]
+                                             for qi, c in zip(q_idx, drop_self(I))])
+    out["recall_delta"] = round(out.get("recall_rescored", out["recall_quant"]) - out["recall_float32"], 4)
+    return out
+
+
+def _ivf_of(index):
+    """(PCA 전처리 / IDMap2 아래의) IndexIVF, 아니면 None"""
+    if isinstance(index, faiss.IndexPreTransform):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexIDMap2):
+        index = faiss.downcast_index(index.index)
+    return index if isinstance(index, faiss.IndexIVF) else None
+
+
+def meta_path(index_path: str) -> str:
+    return os.path.join(os.path.dirname(index_path), META_NAME)
+
+
+def stable_id(doc_id: str) -> int:
+    """청크 id 문자열 → 고정 63bit 정수 (FAISS id, 프로세스/머신이 달라도 동일)"""
+    h = hashlib.blake2b(doc_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(h, "little") & 0x7FFF_FFFF_FFFF_FFFF
+
+
 class FaissStore:
-    def __init__(self, dim: int, index_path: str, docs_path: str):
+    """
+    IndexIDMap2(ANN 인덱스) 래퍼 — 종류는 ann 설정 (resolve_ann 결과, 기본 flat = IndexFlatIP)
+    (ivf/ivfpq 는 IDMap2 없이 IndexIVF 가 stable id 를 직접 저장)
+    - 벡터 id = stable_id(doc["id"]) → 검색 결과 메타데이터를 id 로 조회 (위치 무관)
+    - remove(doc_path): 톰스톤만 기록 (검색에서 제외), compact() 시 실제 삭제
+    - upsert(doc_path, vecs, items): 해당 파일 청크 교체
+    - docs: {id: doc} 매핑 (DocStore, 순서 = 인덱스 순서)
+      docs.bin 에서 로드하면 mmap 된 DocTable 위에서 동작 → 파싱 없음, 검색 결과 top-k 만 디코딩
+      (docs.jsonl 경로를 주면 예전처럼 전체 파싱)
+    - pca_dim: 지정하면 IndexPreTransform(PCA → L2 정규화) 로 감싸 pca_dim 차원으로 저장
+      (PCA 행렬은 faiss.index 안에 함께 저장되고 질의에도 자동 적용, add 전에 train 필요)
+    - ann: ivf/ivfpq/sq8 은 add 전에 train(표본) 필요. nprobe/efSearch/rescore 는 index_meta.json 의 "ann" 에
+      저장되고 load 시 다시 적용 (set_search_params 로 바꿀 수 있음)
+    - ann["rescore"]: add 시 원본 벡터도 보관 → save 때 docs.vecs 로 기록, search 에서 후보 재채점
+    - meta: 빌드 측이 채우는 메타데이터 (model, dimensions, chunking ...) → save 시 index_meta.json,
+      load 시 다시 읽음 (없으면 {} — 예전 인덱스)
+    - load(..., mmap=True): 벡터를 파일 mmap 으로 참조하는 읽기 전용 모드 (서빙 워커용)
+      여러 워커 프로세스가 같은 버전을 열면 OS 페이지 캐시를 공유 → 워커당 로드 시간/메모리가 거의 일정
+      * 공유되는 부분: IndexFlat / IDMap2(Flat) / PCA 전처리 + IDMap2(Flat) / IVFFlat·IVFPQ 역리스트 /
+        HNSWFlat 벡터·그래프 / SQ8·fp16 코드 (IO_FLAG_MMAP_IFC 지원 faiss 기준)
+      * 워커마다 따로 갖는 부분: IDMap2 / IVF direct map 의 id 해시맵 (벡터당 수십 바이트), PCA 행렬, IVF 중심점
+      * add/remove/compact/train/save 는 RuntimeError (mmap 된 배열을 faiss 가 늘리려 하면 프로세스가 abort 됨)
+      * 게시된 버전 파일은 제자리 수정되지 않으므로(새 버전 = 새 디렉토리) mmap 중에도 안전.
+        GC 로 지워져도 열린 매핑은 닫을 때까지 유효
+    """
+    def __init__(self, dim: int, index_path: str, docs_path: str, pca_dim: int | None = None,
+                 ann: Dict[str, Any] | None = None):
         self.dim = dim
         self.index_path = index_path
         self.docs_path = docs_path
-        self.index = faiss.IndexFlatIP(dim)  # 코사인=내적 (임베딩 정규화 가정)
-        self.docs: List[Dict[str, Any]] = []
+        self.ann = dict(ann or {"type": "flat"})
+        spec = index_spec(self.ann)
+        if self.ann["type"] not in ("ivf", "ivfpq"):
+            spec = f"IDMap2,{spec}"
+        if pca_dim and pca_dim < dim:
+            spec = f"PCA{pca_dim},L2norm," + spec
+        # 코사인=내적 (임베딩 정규화 가정)
+        self.index = faiss.index_factory(dim, spec, faiss.METRIC_INNER_PRODUCT)
+        ivf = _ivf_of(self.index)
+        if ivf is not None:
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+            if isinstance(ivf, faiss.IndexIVFPQ):
+                ivf.do_polysemous_training = False  # 검색에 안 쓰는 polysemous 학습 (학습마다 수십 초) 생략
+        self.set_search_params()
+        self.docs = DocStore()
+        self.deleted: set[int] = set()
+        self.meta: Dict[str, Any] = {}
+        self.read_only = False
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError(f"mmap 으로 로드한 인덱스는 읽기 전용입니다: {self.index_path}")
+
+    def __len__(self) -> int:
+        return self.index.ntotal - len(self.deleted)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.index.is_trained
+
+    @property
+    def stored_dim(self) -> int:
+        """인덱스에 실제로 저장되는 벡터 차원 (PCA 적용 시 pca_dim)"""
+        if isinstance(self.index, faiss.IndexPreTransform):
+            return self.index.index.d
+        return self.index.d
+
+    @property
+    def min_train(self) -> int:
+        """train 에 필요한 최소 벡터 수 (PCA: 저장 차원, IVF: nlist, PQ: 코드북 256)"""
+        n = self.stored_dim if isinstance(self.index, faiss.IndexPreTransform) else 0
+        if self.ann["type"] in ("ivf", "ivfpq"):
+            n = max(n, self.ann["nlist"])
+        if self.ann["type"] == "ivfpq":
+            n = max(n, 256)
+        return n
+
+    def set_search_params(self, nprobe: int | None = None, ef_search: int | None = None,
+                          rescore: int | None = None):
+        """검색 파라미터 변경 (해당 종류에만 적용, 저장 시 index_meta.json 에 기록)
+        rescore 는 원본 벡터를 보관하는 인덱스(빌드 시 rescore 지정)에서만 바꿀 수 있음 (0 = 끔)"""
+        if nprobe is not None and "nprobe" in self.ann:
+            self.ann["nprobe"] = int(nprobe)
+        if ef_search is not None and "ef_search" in self.ann:
+            self.ann["ef_search"] = int(ef_search)
+        if rescore is not None and "rescore" in self.ann:
+            self.ann["rescore"] = int(rescore)
+        ps = faiss.ParameterSpace()
+        if "nprobe" in self.ann:
+            ps.set_index_parameter(self.index, "nprobe", self.ann["nprobe"])
+        if "ef_search" in self.ann:
+            ps.set_index_parameter(self.index, "efSearch", self.ann["ef_search"])
+
+    def train(self, embeddings: np.ndarray):
+        """PCA / IVF 군집 / PQ 코드북 학습 (학습이 필요 없는 인덱스면 아무 일도 하지 않음)"""
+        self._check_writable()
+        if not self.index.is_trained:
+            if len(embeddings) < self.min_train:
+                raise ValueError(f"학습 벡터가 부족합니다. (필요 >= {self.min_train}, 입력={len(embeddings)})")
+            self.index.train(embeddings.astype("float32"))
+
+    def _register(self, ids: Iterable[int], items: List[Dict[str, Any]]):
+        for i, it in zip(ids, items):
+            self.docs[i] = it
 
     # ---------- Build ----------
-    def add(self, embeddings: np.ndarray, items: List[Dict[str, Any]]):
+    def add(self, embeddings: np.ndarray, items: List[Dict[str, Any]], keep_docs: bool = True):
+        """
+        keep_docs=False: 벡터만 인덱스에 추가 (문서는 호출 측이 docs.jsonl 에 직접 스트리밍 기록)
+        """
+        self._check_writable()
         assert embeddings.shape[1] == self.dim
-        self.index.add(embeddings.astype("float32"))
-        self.docs.extend(items)
+        ids = np.array([stable_id(it["id"]) for it in items], dtype="int64")
+        if self.deleted and not self.deleted.isdisjoint(ids.tolist()):
+            self.compact()  # 톰스톤과 같은 id 를 다시 넣으면 인덱스에 id 가 중복되므로 먼저 정리
+        self.index.add_with_ids(embeddings.astype("float32"), ids)
+        if keep_docs:
+            self._register(ids.tolist(), items)
+            if "rescore" in self.ann:
+                for i, v in zip(ids.tolist(), embeddings.astype("float32")):
+                    self.docs.set_vector(i, v)
 
-    def save(self):
+    def remove(self, doc_path: str) -> int:
+        """doc_path 의 청크를 톰스톤 처리 (검색 결과에서 즉시 제외). 반환: 제거한 청크 수"""
+        self._check_writable()
+        ids = [i for i in self.docs.ids_for_path(doc_path) if i not in self.deleted]
+        self.deleted.update(ids)
+        if self.index.ntotal and len(self.deleted) > COMPACT_RATIO * self.index.ntotal:
+            self.compact()
+        return len(ids)
+
+    def upsert(self, doc_path: str, embeddings: np.ndarray, items: List[Dict[str, Any]]) -> int:
+        """doc_path 의 기존 청크를 지우고 새 청크로 교체. 반환: 제거된 기존 청크 수"""
+        n = self.remove(doc_path)
+        if len(items):
+            self.add(embeddings, items)
+        return n
+
+    def compact(self) -> int:
+        """톰스톤 벡터/문서를 실제로 삭제해 공간 회수. 반환: 삭제 개수"""
+        self._check_writable()
+        if not self.deleted:
+            return 0
+        ids = np.fromiter(self.deleted, dtype="int64", count=len(self.deleted))
+        if self.ann["type"] == "hnsw":
+            n = self._rebuild_without(ids)
+        elif self.ann["type"] in ("ivf", "ivfpq"):
+            self._unwrap_ivf()
+            n = self.index.remove_ids(faiss.IDSelectorArray(ids))  # Hashtable direct map 은 IDSelectorArray 만 지원
+        else:
+            n = self.index.remove_ids(faiss.IDSelectorBatch(ids))
+        for i in self.deleted:
+            self.docs.pop(i, None)
+        self.deleted.clear()
+        return n
+
+    def _rebuild_without(self, ids: np.ndarray) -> int:
+        """remove_ids 를 지원하지 않는 인덱스(HNSW): 남길 벡터를 복원해 비운 인덱스에 다시 추가"""
+        idmap = self.index
+        if isinstance(idmap, faiss.IndexPreTransform):
+            idmap = faiss.downcast_index(idmap.index)  # 벡터는 PCA 적용 후 차원으로 저장돼 있음
+        all_ids = faiss.vector_to_array(idmap.id_map)
+        keep = ~np.isin(all_ids, ids)
+        vecs = idmap.index.reconstruct_n(0, idmap.ntotal)[keep]
+        idmap.reset()
+        if len(vecs):
+            idmap.add_with_ids(vecs, all_ids[keep])
+        self.index.ntotal = idmap.ntotal
+        self.set_search_params()
+        return int(len(all_ids) - keep.sum())
+
+    def _unwrap_ivf(self):
+        """
+        예전 빌드의 IDMap2(IVF) → IVF 가 stable id 를 직접 갖는 형태로 변환 (compact 전에 호출)
+        역리스트의 내부 번호(추가 순서)를 id_map 으로 stable id 로 바꾼 뒤 IDMap2 를 뺀 복사본으로 교체. 벡터 코드는 그대로
+        """
+        parent = self.index if isinstance(self.index, faiss.IndexPreTransform) else None
+        idmap = faiss.downcast_index(parent.index) if parent is not None else self.index
+        if not isinstance(idmap, faiss.IndexIDMap2):
+            return
+        id_map = faiss.vector_to_array(idmap.id_map)
+        ivf = faiss.downcast_index(idmap.index)
+        invlists = ivf.invlists
+        for l in range(ivf.nlist):
+            n = invlists.list_size(l)
+            if n:
+                ptr, cptr = invlists.get_ids(l), invlists.get_codes(l)
+                new = id_map[faiss.rev_swig_ptr(ptr, n)].astype("int64")
+                codes = faiss.rev_swig_ptr(cptr, n * invlists.code_size).copy()
+                invlists.release_ids(l, ptr)
+                invlists.release_codes(l, cptr)
+                invlists.update_entries(l, 0, n, faiss.swig_ptr(new), faiss.swig_ptr(codes))
+        index = ivf
+        if parent is not None:
+            index = faiss.IndexPreTransform(ivf)  # 같은 PCA 변환을 IVF 위에 바로 연결 (복사 전 임시 래퍼)
+            for t in reversed(range(parent.chain.size())):
+                index.prepend_transform(parent.chain.at(t))
+        self.index = faiss.deserialize_index(faiss.serialize_index(index))
+        _ivf_of(self.index).set_direct_map_type(faiss.DirectMap.Hashtable)
+        self.set_search_params()
+
+    def save(self, write_docs: bool = True):
+        """저장 전 compact → 파일에는 톰스톤이 남지 않음"""
+        self._check_writable()
+        self.compact()
         os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
         faiss.write_index(self.index, self.index_path)
-        with open(self.docs_path, "w", encoding="utf-8") as f:
-            for it in self.docs:
-                f.write(json.dumps(it, ensure_ascii=False) + "\n")
+        if self.meta:
+            self.meta.update({"dim": self.dim, "stored_dim": self.stored_dim, "ntotal": self.index.ntotal,
+                              "metric": "ip", "normalize": "l2",
+                              "index_type": type(self.index).__name__, "ann": self.ann,
+                              "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+            with open(meta_path(self.index_path), "w", encoding="utf-8") as f:
+                json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        if not write_docs:
+            return
+        if self.docs_path.endswith(".jsonl"):
+            with open(self.docs_path, "w", encoding="utf-8") as f:
+                for it in self.docs.values():
+                    f.write(json.dumps(it, ensure_ascii=False) + "\n")
+            return
+        if "rescore" in self.ann:
+            write_doc_table(self.docs_path, ((i, d, self.docs.vector(i)) for i, d in self.docs.items()))
+        else:
+            write_doc_table(self.docs_path, self.docs.items())
 
     # ---------- Load ----------
     @classmethod
-    def load(cls, index_path: str, docs_path: str):
-        index = faiss.read_index(index_path)
+    def load(cls, index_path: str, docs_path: str, mmap: bool = False):
+        """mmap=True: 읽기 전용 공유 로드 (클래스 docstring 참고)"""
+        index = faiss.read_index(index_path, MMAP_FLAG if mmap else 0)
         dim = index.d
         store = cls(dim, index_path, docs_path)
-        store.index = index
-        store.docs = []
+        store.read_only = mmap
+        if not docs_path.endswith(".jsonl"):
+            store.index = index
+            store.docs = DocStore(DocTable(docs_path))
+            store._load_meta()
+            return store
+        items: List[Dict[str, Any]] = []
         with open(docs_path, "r", encoding="utf-8") as f:
             for line in f:
-                store.docs.append(json.loads(line))
+                items.append(json.loads(line))
+        ids = [stable_id(it["id"]) for it in items]
+        if isinstance(index, (faiss.IndexIDMap2, faiss.IndexPreTransform, faiss.IndexIVF)):
+            store.index = index
+        else:
+            # 예전 형식(위치 기반 IndexFlatIP) → 같은 순서로 id 부여해 변환
+            if index.ntotal != len(items):
+                raise ValueError(f"인덱스/문서 개수 불일치 (index={index.ntotal}, docs={len(items)})")
+            if index.ntotal:
+                store.index.add_with_ids(index.reconstruct_n(0, index.ntotal), np.asarray(ids, dtype="int64"))
+        store._register(ids, items)
+        store._load_meta()
         return store
 
+    def _load_meta(self):
+        """index_meta.json 읽기 + 인덱스 종류 확인, 저장된 nprobe/efSearch 적용"""
+        mp = meta_path(self.index_path)
+        if os.path.exists(mp):
+            with open(mp, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+        self.ann = _detect_ann(self.index)
+        saved = self.meta.get("ann") or {}
+        if saved.get("rescore"):
+            self.ann["rescore"] = saved["rescore"]
+        self.set_search_params(saved.get("nprobe"), saved.get("ef_search"))
+
     # ---------- Search ----------
     def search(self, query_vec: np.ndarray, top_k: int = 5) -> List[Dict[str, Any]]:
         if query_vec.ndim == 1:
             query_vec = query_vec[None, :]
-        D, I = self.index.search(query_vec.astype("float32"), top_k)
+        return self.search_batch(query_vec[:1], top_k)[0]
+
+    def search_batch(self, queries: np.ndarray, top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """질의 행렬 (Q, dim) → index.search 1회 (FAISS 가 질의들을 묶어 처리). 질의별 결과는 search 와 동일"""
+        queries = np.atleast_2d(queries).astype("float32")
+        if not len(queries):
+            return []
+        # 톰스톤이 결과를 차지할 수 있으므로 그만큼 더 가져온 뒤 걸러냄
+        shortlist = top_k * self.ann["rescore"] if self.ann.get("rescore") else top_k
+        k = min(shortlist + len(self.deleted), max(self.index.ntotal, 1))
+        D, I = self.index.search(queries, k)
         out = []
-        for rank, (score, idx) in enumerate(zip(D[0], I[0])):
-            if idx == -1:
+        for q, d, i in zip(queries, D, I):
+            if self.ann.get("rescore"):
+                d, i = self._rescore(q, d, i, top_k)
+            out.append(self._results(d, i, top_k))
+        return out
+
+    def _results(self, D: np.ndarray, I: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        out = []
+        for score, idx in zip(D, I):
+            if idx == -1 or idx in self.deleted:
                 continue
-            doc = self.docs[idx]
+            doc = self.docs[int(idx)]
             out.append({
                 "doc_id": doc["id"],
                 "chunk": doc["text"],
-                "score": float(score),  # 내적값(정규화 가정 → 코사인)
+                "score": float(score),  # 내적값(정규화 가정 → 코사인), rescore 시 float32 원본 기준
                 "meta": doc.get("meta", {})
             })
+            if len(out) >= top_k:
+                break
         return out
+
+    def _rescore(self, query: np.ndarray, D: np.ndarray, I: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """후보 중 톰스톤을 빼고 원본 벡터로 재채점. 원본이 없는 후보가 있으면(예전 인덱스) 양자화 점수 그대로"""
+        keep = [(d, i) for d, i in zip(D, I) if i != -1 and i not in self.deleted]
+        vecs = [self.docs.vector(int(i)) for _, i in keep]
+        if not keep or any(v is None for v in vecs):
+            return D, I
+        scores, ids = rescore(query, np.array([i for _, i in keep], dtype="int64"), np.vstack(vecs), top_k)
+        return scores, ids
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+PDF 추출 텍스트 캐시 (content-addressed)
+- 키: 파일 sha256 + 추출기 버전 → 내용이 같으면 경로/이름이 바뀌어도 재사용
+- 값: 페이지별 텍스트 리스트를 gzip(JSON)으로 저장
+- 용량 상한(max_bytes) 초과 시 가장 오래 안 쓴 파일부터 삭제 (LRU, mtime 기준)
+"""
+
+import os, json, gzip
+from typing import List
+
+EXTRACTOR_VERSION = "pages-v1"  # 추출/페이지 분할 로직이 바뀌면 올릴 것
+
+
+def _pypdf_version() -> str:
+    try:
+        import pypdf  # type: ignore
+        return pypdf.__version__
+    except Exception:
+        return "none"
+
+
+class TextCache:
+    def __init__(self, root: str = "indices/.cache/text", max_bytes: int = 512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.version = f"{EXTRACTOR_VERSION}-pypdf{_pypdf_version()}"
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], f"{sha256}.{self.version}.json.gz")
+
+    def get(self, sha256: str) -> List[str] | None:
+        p = self._path(sha256)
+        try:
+            with gzip.open(p, "rt", encoding="utf-8") as f:
+                pages = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            print(f"[WARN] 텍스트 캐시 손상, 무시: {p} ({e})")
+            self.misses += 1
+            return None
+        try:
+            os.utime(p)  # LRU: 최근 사용 표시
+        except OSError:
+            pass
+        self.hits += 1
+        return pages
+
+    def put(self, sha256: str, pages: List[str]):
+        p = self._path(sha256)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        tmp = p + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(pages, f, ensure_ascii=False)
+        os.replace(tmp, p)
+        self.evict()
+
+    def evict(self):
+        """총 용량이 max_bytes 이하가 될 때까지 오래된 항목 삭제"""
+        entries = []
+        total = 0
+        for dirpath, _, names in os.walk(self.root):
+            for n in names:
+                fp = os.path.join(dirpath, n)
+                try:
+                    st = os.stat(fp)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, fp))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, fp in sorted(entries):
+            try:
+                os.remove(fp)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+임베딩 요청용 토큰 수 추정 / 토큰 예산 배치 패킹
+- tiktoken 이 있으면 cl100k_base 로 정확히 계산 (text-embedding-3-* 토크나이저)
+- 없으면 보정된 글자-토큰 비율로 추정 (한글은 거의 1글자≈1토큰, 그 외 ≈4글자/토큰)
+"""
+
+import re
+from typing import List, Tuple
+
+try:
+    import tiktoken  # pip install tiktoken (선택)
+    _ENC = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENC = None
+
+# cl100k_base 로 한국어 규제 문서를 재어 본 대략치 (보수적으로 약간 크게 잡음)
+HANGUL_TOKENS_PER_CHAR = 1.0
+OTHER_CHARS_PER_TOKEN = 3.5
+
+MAX_INPUT_TOKENS = 8191        # 입력 1개 상한 (text-embedding-3-*)
+MAX_REQUEST_TOKENS = 300_000   # 요청 1회 합계 상한
+MAX_REQUEST_INPUTS = 2048      # 요청 1회 입력 개수 상한
+
+_HANGUL = re.compile(r"[가-힣ᄀ-ᇿ㄰-㆏]")
+
+
+def count_tokens(text: str) -> int:
+    if _ENC is not None:
+        return len(_ENC.encode(text, disallowed_special=()))
+    n_ko = len(_HANGUL.findall(text))
+    n_other = len(text) - n_ko
+    return int(n_ko * HANGUL_TOKENS_PER_CHAR + n_other / OTHER_CHARS_PER_TOKEN) + 1
+
+
+def split_by_tokens(text: str, max_tokens: int) -> List[str]:
+    """max_tokens 이하 조각들로 분할 (tiktoken 없으면 추정 비율로 글자 수 환산)"""
+    if _ENC is not None:
+        ids = _ENC.encode(text, disallowed_special=())
+        return [_ENC.decode(ids[i:i + max_tokens]) for i in range(0, len(ids), max_tokens)] or [""]
+    pieces: List[str] = []
+    rest = text
+    while rest:
+        n = count_tokens(rest)
+        if n <= max_tokens:
+            pieces.append(rest)
+            break
+        cut = max(1, int(len(rest) * max_tokens / n * 0.95))
+        while cut > 1 and count_tokens(rest[:cut]) > max_tokens:
+            cut = int(cut * 0.9)
+        pieces.append(rest[:cut])
+        rest = rest[cut:]
+    return pieces or [""]
+
+
+def pack_batches(token_counts: List[int], max_tokens: int, max_items: int) -> List[Tuple[int, int]]:
+    """
+    입력 순서를 유지한 채 [start, end) 구간으로 묶음
+    - 구간 토큰 합 <= max_tokens, 개수 <= max_items (단일 항목이 넘으면 단독 배치)
+    """
+    out: List[Tuple[int, int]] = []
+    start, total = 0, 0
+    for i, n in enumerate(token_counts):
+        if i > start and (total + n > max_tokens or i - start >= max_items):
+            out.append((start, i))
+            start, total = i, 0
+        total += n
+    if start < len(token_counts):
+        out.append((start, len(token_counts)))
+    return out
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+버전별 인덱스 디렉토리 (무중단 교체)
+- 빌드 결과는 <index_dir>/versions/<버전>/ 에 새로 기록 (faiss.index, docs.bin, manifest.json, ...)
+  docs.bin 사이드카: docs.rows.npy, docs.order.npy, docs.paths.json, docs.vecs(재채점 시)
+- 완료 후 파일별 sha256 을 version.json 에 기록하고, <index_dir>/CURRENT 포인터를 os.replace 로 교체
+  → 읽는 쪽은 교체 전까지 이전 버전을 그대로 읽음 (faiss.index/docs.bin 및 사이드카 짝이 섞이지 않음)
+- 오래된 버전은 retention(keep) 개수만 남기고 삭제
+- CURRENT 가 없으면 예전 단일 디렉토리 구조(<index_dir>/faiss.index)로 간주
+"""
+
+import os, json, time, shutil
+from typing import Dict, Any, List
+
+from student.day2.impl.manifest import file_sha256
+
+CURRENT_NAME = "CURRENT"
+VERSIONS_DIR = "versions"
+VERSION_INFO = "version.json"
+STAGING_SUFFIX = ".building"
+KEEP_VERSIONS = 3
+STAGING_MAX_AGE = 6 * 3600  # 이 시간보다 오래된 미완성 빌드 디렉토리는 GC 대상
+
+
+def current_version(index_dir: str) -> str | None:
+    p = os.path.join(index_dir, CURRENT_NAME)
+    if not os.path.exists(p):
+        return None
+    with open(p, "r", encoding="utf-8") as f:
+        name = f.read().strip()
+    return name or None
+
+
+def resolve_index_dir(index_dir: str) -> str:
+    """읽을 디렉토리: CURRENT 가 가리키는 버전, 없으면 index_dir 자체(예전 구조)"""
+    name = current_version(index_dir)
+    if name is None:
+        return index_dir
+    return os.path.join(index_dir, VERSIONS_DIR, name)
+
+
+def list_versions(index_dir: str) -> List[str]:
+    """완료된 버전 이름 (오래된 것 → 최신 순)"""
+    root = os.path.join(index_dir, VERSIONS_DIR)
+    if not os.path.isdir(root):
+        return []
+    names = [n for n in os.listdir(root)
+             if not n.endswith(STAGING_SUFFIX) and os.path.exists(os.path.join(root, n, VERSION_INFO))]
+    return sorted(names, key=_version_key)
+
+
+def _version_key(name: str):
+    """"20250101-120000-10" 이 "-2" 보다 뒤로 가도록 같은 초 안의 번호는 정수 비교"""
+    parts = name.split("-")
+    seq = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 0
+    return ("-".join(parts[:2]), seq)
+
+
+def begin_version(index_dir: str) -> str:
+    """새 빌드용 스테이징 디렉토리 생성 후 경로 반환 (publish 전에는 읽는 쪽에 보이지 않음)"""
+    root = os.path.join(index_dir, VERSIONS_DIR)
+    os.makedirs(root, exist_ok=True)
+    base = time.strftime("%Y%m%d-%H%M%S")
+    n = 0
+    while True:
+        name = base if n == 0 else f"{base}-{n}"
+        path = os.path.join(root, name + STAGING_SUFFIX)
+        if not os.path.exists(os.path.join(root, name)) and not os.path.exists(path):
+            try:
+                os.makedirs(path)
+                return path
+            except FileExistsError:
+                pass
+        n += 1
+
+
+def abort_version(staging_dir: str):
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def _checksums(version_dir: str) -> Dict[str, str]:
+    return {n: file_sha256(os.path.join(version_dir, n))
+            for n in sorted(os.listdir(version_dir))
+            if n != VERSION_INFO and not n.endswith(".tmp") and os.path.isfile(os.path.join(version_dir, n))}
+
+
+def publish(index_dir: str, staging_dir: str, keep: int = KEEP_VERSIONS, info: Dict[str, Any] | None = None) -> str:
+    """
+    스테이징 디렉토리를 완료 처리하고 CURRENT 를 새 버전으로 교체
+    1) 파일별 sha256 → version.json
+    2) <이름>.building → <이름> (rename)
+    3) CURRENT.tmp 작성 → os.replace(CURRENT.tmp, CURRENT)
+    4) gc(keep)
+    반환: 새 버전 디렉토리
+    """
+    name = os.path.basename(staging_dir.rstrip(os.sep))
+    if name.endswith(STAGING_SUFFIX):
+        name = name[:-len(STAGING_SUFFIX)]
+    meta = dict(info or {})
+    meta.update({"version": name, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "files": _checksums(staging_dir)})
+    with open(os.path.join(staging_dir, VERSION_INFO), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    final = os.path.join(index_dir, VERSIONS_DIR, name)
+    os.replace(staging_dir, final)
+
+    p = os.path.join(index_dir, CURRENT_NAME)
+    with open(p + ".tmp", "w", encoding="utf-8") as f:
+        f.write(name + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(p + ".tmp", p)
+    print(f"[INFO] current → {name}")
+    gc(index_dir, keep)
+    return final
+
+
+def verify(version_dir: str) -> bool:
+    """version.json 의 sha256 과 실제 파일 비교"""
+    p = os.path.join(version_dir, VERSION_INFO)
+    if not os.path.exists(p):
+        return False
+    with open(p, "r", encoding="utf-8") as f:
+        expected = json.load(f).get("files", {})
+    for n, sha in expected.items():
+        fp = os.path.join(version_dir, n)
+        if not os.path.exists(fp) or file_sha256(fp) != sha:
+            return False
+    return True
+
+
+def gc(index_dir: str, keep: int = KEEP_VERSIONS) -> List[str]:
+    """
+    최신 keep 개 + CURRENT 버전만 남기고 삭제, 오래된 미완성 스테이징 디렉토리도 정리
+    - 이미 로드된 인덱스는 메모리에 있으므로 디렉토리가 지워져도 서비스에 영향 없음
+    반환: 삭제한 디렉토리 이름
+    """
+    root = os.path.join(index_dir, VERSIONS_DIR)
+    if not os.path.isdir(root):
+        return []
+    cur = current_version(index_dir)
+    done = list_versions(index_dir)
+    drop = [n for n in done[:max(0, len(done) - max(1, keep))] if n != cur]
+    now = time.time()
+    for n in os.listdir(root):
+        if n.endswith(STAGING_SUFFIX) and now - os.path.getmtime(os.path.join(root, n)) > STAGING_MAX_AGE:
+            drop.append(n)
+    for n in drop:
+        shutil.rmtree(os.path.join(root, n), ignore_errors=True)
+    if drop:
+        print(f"[INFO] 이전 인덱스 버전 삭제: {drop}")
+    return drop
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+인덱스 자동 갱신 데몬 (폴링 방식 디렉토리 감시)
+- interval 초마다 감시 경로의 txt/md/pdf 목록과 (size, mtime) 스냅샷 비교
+  → inotify/FSEvents 없이 어디서나(네트워크 드라이브, Docker 볼륨 포함) 동작
+- 변경이 감지되면 debounce 초 동안 추가 변경이 없을 때까지 기다린 뒤 증분 빌드 1회
+  (파일 여러 개 복사/큰 PDF 쓰기 도중에 빌드가 여러 번 돌지 않도록)
+- 빌드는 build_index(incremental=True): 추가/변경 파일만 임베딩, 삭제 파일 청크 제거, 새 버전 publish
+"""
+
+import os, time
+from typing import Dict, List, Tuple, Any
+
+from student.day2.impl.ingest import collect_files
+
+Snapshot = Dict[str, Tuple[int, float]]
+
+
+def snapshot(paths: List[str]) -> Snapshot:
+    """경로별 (size, mtime). 스캔 도중 지워진 파일은 건너뜀"""
+    out: Snapshot = {}
+    for fp in collect_files(paths):
+        try:
+            st = os.stat(fp)
+        except OSError:
+            continue
+        out[fp] = (st.st_size, st.st_mtime)
+    return out
+
+
+def _describe(old: Snapshot, new: Snapshot) -> str:
+    added = sum(1 for fp in new if fp not in old)
+    removed = sum(1 for fp in old if fp not in new)
+    modified = sum(1 for fp in new if fp in old and new[fp] != old[fp])
+    return f"추가 {added}, 변경 {modified}, 삭제 {removed}"
+
+
+def watch(paths: List[str], index_dir: str, interval: float = 2.0, debounce: float = 5.0,
+          max_cycles: int | None = None, **build_kwargs: Any):
+    """
+    paths 를 감시하며 index_dir 를 계속 최신 상태로 유지 (Ctrl+C 로 종료)
+    - 시작 시 증분 빌드 1회 (데몬이 꺼져 있던 동안의 변경 반영)
+    - build_kwargs: build_index 옵션 (model, batch_size, workers, chunker ...)
+    - max_cycles: 빌드 횟수 상한 (테스트용, None=무한)
+    - 빌드 실패 시 로그만 남기고 다음 변경을 기다림 (CURRENT 는 이전 버전 유지)
+    """
+    from student.day2.impl.build_index import build_index  # build_index → watch 순환 import 방지
+
+    build_kwargs["incremental"] = True
+    cycles = 0
+
+    def run(reason: str) -> bool:
+        nonlocal cycles
+        print(f"[INFO] watch: 인덱스 갱신 ({reason})")
+        t0 = time.time()
+        try:
+            build_index(paths, index_dir, **build_kwargs)
+            print(f"[INFO] watch: 갱신 완료 {time.time() - t0:.1f}s")
+        except Exception as e:
+            print(f"[WARN] watch: 빌드 실패, 이전 인덱스 유지: {e}")
+        cycles += 1
+        return max_cycles is not None and cycles >= max_cycles
+
+    last = snapshot(paths)
+    if run("시작"):
+        return
+    print(f"[INFO] watch: {paths} 감시 중 (interval={interval}s, debounce={debounce}s)")
+    try:
+        while True:
+            time.sleep(interval)
+            cur = snapshot(paths)
+            if cur == last:
+                continue
+            # debounce: 마지막 변경 후 debounce 초 동안 조용해질 때까지 대기
+            quiet_since = time.time()
+            pending = cur
+            while time.time() - quiet_since < debounce:
+                time.sleep(min(interval, debounce))
+                nxt = snapshot(paths)
+                if nxt != pending:
+                    pending = nxt
+                    quiet_since = time.time()
+            reason = _describe(last, pending)
+            last = pending
+            if run(reason):
+                return
+    except KeyboardInterrupt:
+        print("[INFO] watch: 종료")
@@ -47,8 +47,9 @@ Day2Agent, Day2Plan, FaissStore, Embeddings, build_index = _import_all()
 
 # ───────── 2) 유틸 ─────────
 def _idx_paths(index_dir: str):
-    d = Path(index_dir)
-    return d / "faiss.index", d / "docs.jsonl"
+    from student.day2.impl.registry import index_files  # CURRENT 버전의 faiss.index / docs.bin
+    idx, docs = index_files(index_dir)
+    return Path(idx), Path(docs)
 
 def _file_info(p: Path) -> str:
     try:
@@ -57,6 +58,23 @@ def _file_info(p: Path) -> str:
         return f"{p} (size: ?)"""
 
 def _read_docs_head(docs_path: Path, n: int = 5):
+    if docs_path.suffix == ".bin":
+        from student.day2.impl.docstore import DocTable
+        table = DocTable(str(docs_path))
+        out = []
+        empty_cnt = 0
+        for i in range(min(n, len(table))):
+            try:
+                obj = table.decode(i)
+                text = (obj.get("text") or "").strip()
+                if not text:
+                    empty_cnt += 1
+                out.append({"i": i, "id": obj.get("id"), "path": obj["meta"].get("path"), "len": len(text)})
+            except Exception:
+                out.append({"i": i, "parse_error": True})
+        total = len(table)
+        table.close()
+        return total, empty_cnt, out
     lines = docs_path.read_text(encoding="utf-8", errors="ignore").splitlines()
     out = []
     empty_cnt = 0
@@ -111,7 +129,7 @@ def _diagnose(index_dir: str, paths: str, model: str, autobuild: bool, batch_siz
         print("[WARN] faiss.index 없음 →", idx_path)
         ok = False
     if not docs_path.exists():
-        print("[WARN] docs.jsonl 없음  →", docs_path)
+        print("[WARN] 문서 파일 없음  →", docs_path)
         ok = False
     if not ok:
         if not autobuild:
@@ -120,17 +138,18 @@ def _diagnose(index_dir: str, paths: str, model: str, autobuild: bool, batch_siz
             return None, None
         print("[INFO] --autobuild 지정 → 인덱스 생성 시작")
         build_index(paths, index_dir, model, batch_size)
+        idx_path, docs_path = _idx_paths(index_dir)
 
     # 파일 정보
     print("[INFO] 인덱스 파일:", _file_info(idx_path))
     print("[INFO] 문서 파일  :", _file_info(docs_path))
     try:
         total, empty_cnt, head = _read_docs_head(docs_path, n=5)
-        print(f"[OK] docs.jsonl 라인수={total}, (빈 텍스트 {empty_cnt})")
+        print(f"[OK] {docs_path.name} 문서 수={total}, (빈 텍스트 {empty_cnt})")
         for r in head:
             print("   ", r)
     except Exception as e:
-        print("[WARN] docs.jsonl 파싱 이슈:", e)
+        print(f"[WARN] {docs_path.name} 파싱 이슈:", e)
 
     # FAISS 로드
     try:
@@ -171,6 +190,35 @@ def _diagnose(index_dir: str, paths: str, model: str, autobuild: bool, batch_siz
 
     return store, dim
 
+def _check_remove_compact(n: int = 10_000, dim: int = 16) -> bool:
+    """인덱스 종류별로 합성 벡터 추가 → 절반 remove → compact → 남은 벡터가 자기 자신을 top-1 로 찾는지 확인"""
+    import tempfile
+    import numpy as np
+    from student.day2.impl.store import INDEX_TYPES, resolve_ann
+
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((n, dim)).astype("float32")
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    items = [{"id": f"{'a' if i < n // 2 else 'b'}::chunk_{i:05d}", "text": str(i),
+              "meta": {"path": "a" if i < n // 2 else "b"}} for i in range(n)]
+    ok = True
+    for kind in INDEX_TYPES:
+        ann = resolve_ann({"type": kind, "nlist": 16, "nprobe": 16, "pq_m": dim // 2}, n, dim, n)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = FaissStore(dim, os.path.join(tmp, "faiss.index"), os.path.join(tmp, "docs.bin"), ann=ann)
+            store.train(x)
+            store.add(x, items)
+            store.remove("a")
+            store.compact()
+            hits = store.search_batch(x[n // 2:], top_k=1)
+        found = sum(1 for it, h in zip(items[n // 2:], hits) if h and h[0]["doc_id"] == it["id"])
+        stale = sum(1 for h in hits if h and h[0]["doc_id"].startswith("a::"))
+        passed = found >= 0.95 * (n - n // 2) and stale == 0
+        ok &= passed
+        print(f"[{'OK' if passed else 'FAIL'}] remove→compact→search ({kind}): "
+              f"자기 자신 top-1 {found}/{n - n // 2}, 삭제된 청크 {stale}")
+    return ok
+
 # ───────── 4) 검색 + Agent.handle ─────────
 def _run_search_and_agent(query: str, index_dir: str, model: str, top_k: int):
     from student.day2.impl.rag import Day2Agent
@@ -181,7 +229,7 @@ def _run_search_and_agent(query: str, index_dir: str, model: str, top_k: int):
     # 임베딩/스토어 준비
     emb = Embeddings(model=model, batch_size=4)
     qv = emb.encode([query])[0]
-    store = FaissStore.load(str(Path(index_dir)/"faiss.index"), str(Path(index_dir)/"docs.jsonl"))
+    store = FaissStore.load(*map(str, _idx_paths(index_dir)))
 
     # 로우 검색
     try:
@@ -239,6 +287,10 @@ def main():
     print("[INFO] .env :", ENV_PATH, "| OPENAI_API_KEY:", bool(os.getenv("OPENAI_API_KEY")))
     print("[INFO] index:", args.index_dir, "| paths:", args.paths, "| model:", args.model)
 
+    if not _check_remove_compact():
+        print("[FAIL] 인덱스 삭제/정리 후 검색 결과가 어긋남 (store.compact 확인)")
+        sys.exit(2)
+
     store, dim = _diagnose(args.index_dir, args.paths, args.model, args.autobuild, args.batch_size)
     if store is None:
         sys.exit(2)